@@ -3,10 +3,14 @@ Aplicación monolítica principal
 Unifica todos los controllers y aplica validación de API Key del gateway
 """
 from flask import Flask, jsonify
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from middleware.auth import gatekeeper_required
+from services import cache, circuit_breaker, precalentamiento
+from controllers import cache_respuestas
 from controllers.usuarios_controller import usuarios_bp
 from controllers.proyectos_controller import proyectos_bp
 from controllers.tareas_controller import tareas_bp
-from controllers.soap_controller import soap_bp
+from controllers.soap_controller import soap_wsgi, registros_bp
 
 app = Flask(__name__)
 
@@ -14,13 +18,28 @@ app = Flask(__name__)
 app.register_blueprint(usuarios_bp)
 app.register_blueprint(proyectos_bp)
 app.register_blueprint(tareas_bp)
-app.register_blueprint(soap_bp)
+app.register_blueprint(registros_bp)
+
+# Montar la aplicación SOAP (spyne) directamente como WSGI en /soap
+app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {"/soap": soap_wsgi})
+
+# Precalentar la cache con los proyectos más leídos y mantenerlos frescos
+precalentamiento.iniciar()
 
 
 @app.route("/health", methods=["GET"])
 def health():
-    """Endpoint de salud del monolito"""
-    return jsonify({"status": "ok", "service": "monolito"}), 200
+    """Endpoint de salud del monolito; responde 503 hasta terminar el precalentamiento de la cache"""
+    if not precalentamiento.listo():
+        return jsonify({"status": "iniciando", "service": "monolito", "detalle": "precalentando cache"}), 503
+    return jsonify({"status": "ok", "service": "monolito", "circuitos": circuit_breaker.estados()}), 200
+
+
+@app.route("/cache/stats", methods=["GET"])
+@gatekeeper_required
+def cache_stats():
+    """Contadores de la cache L1 de respuestas y de la cache de Redis (de este proceso)"""
+    return jsonify({"l1": cache_respuestas.estadisticas(), "l2": cache.estadisticas()}), 200
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+"""
+Utilidades para los endpoints de alta masiva (/bulk)
+"""
+from flask import request, jsonify
+import os
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+
+def leer_items_bulk():
+    """
+    Lee los items del body: un arreglo JSON o un objeto {"items": [...]}.
+    Lanza ValueError si el body no es válido.
+    """
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("Se espera un arreglo no vacío de items o un objeto {'items': [...]}")
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValueError(f"Se permiten como máximo {BULK_MAX_ITEMS} items por request")
+    return items
+
+
+def item_ok(indice, item):
+    """Resultado de un item procesado correctamente"""
+    return {"indice": indice, "ok": True, "data": item}
+
+
+def item_error(indice, error):
+    """Resultado de un item rechazado"""
+    return {"indice": indice, "ok": False, "error": error}
+
+
+def responder_bulk(resultados, mensaje, status_ok=201):
+    """
+    Respuesta con el resultado de cada item, en el orden recibido.
+    Status: status_ok si todos se procesaron, 207 si hubo fallas parciales
+    y 400 si ninguno se pudo procesar.
+    """
+    exitosos = sum(1 for r in resultados if r["ok"])
+    if exitosos == len(resultados):
+        status = status_ok
+    else:
+        status = 207 if exitosos else 400
+    return jsonify({
+        "mensaje": mensaje,
+        "exitosos": exitosos,
+        "fallidos": len(resultados) - exitosos,
+        "resultados": resultados
+    }), status
@@ -0,0 +1,136 @@
+"""
+Cache L1 de respuestas en memoria del proceso, delante de la cache de Redis (L2).
+Guarda el cuerpo ya serializado de las respuestas 200 de los endpoints de
+lectura, de modo que un hit no hace round trip a Redis ni vuelve a
+serializar JSON. Está acotada en entradas y bytes (LRU) con TTL por entrada,
+y cada entrada queda asociada a la generación de su colección: una
+invalidación (local o recibida por pub/sub) la descarta.
+
+Se configura por endpoint con el TTL del decorador, que puede sobreescribirse
+con L1_CACHE_ENDPOINTS="get_all_proyectos=10,get_tareas=0" (0 la desactiva).
+
+contar_accesos registra las lecturas por id para el precalentamiento de la
+cache (services/precalentamiento.py).
+
+También provee GET condicional (cache_l1 con etag=True): el ETag de las
+listas es la versión de la colección con la que se armó el cuerpo, y un
+If-None-Match vigente se responde 304 sin cargar datos.
+"""
+from flask import request, make_response, Response
+from functools import wraps
+from collections import Counter
+import os
+import threading
+from services.cache_local import LRUCache
+from services import cache, precalentamiento
+
+L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", "5000"))
+L1_CACHE_MAX_BYTES = int(os.getenv("L1_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+L1_CACHE_TTL = float(os.getenv("L1_CACHE_TTL", "5"))
+
+
+def _leer_config_endpoints():
+    config = {}
+    for par in os.getenv("L1_CACHE_ENDPOINTS", "").split(","):
+        if "=" in par:
+            endpoint, ttl = par.split("=", 1)
+            config[endpoint.strip()] = float(ttl)
+    return config
+
+
+L1_CACHE_ENDPOINTS = _leer_config_endpoints()
+
+l1 = LRUCache(L1_CACHE_MAX_ENTRIES, max_bytes=L1_CACHE_MAX_BYTES)
+_contadores = {}   # endpoint -> Counter
+_contadores_lock = threading.Lock()
+
+
+def _contar(endpoint, evento):
+    with _contadores_lock:
+        _contadores.setdefault(endpoint, Counter())[evento] += 1
+
+
+def _responder(cuerpo, mimetype, etag):
+    """Respuesta 200 con el cuerpo ya serializado, o 304 si el cliente tiene ese ETag"""
+    if etag is not None and request.if_none_match.contains(etag):
+        respuesta = Response(status=304)
+    else:
+        respuesta = Response(cuerpo, status=200, mimetype=mimetype)
+    if etag is not None:
+        respuesta.set_etag(etag)
+    return respuesta
+
+
+def cache_l1(coleccion, ttl=L1_CACHE_TTL, etag=False):
+    """
+    Decorador para endpoints GET de lectura de una colección.
+    Debe ir debajo de los decoradores de autenticación, que se siguen
+    evaluando en cada request.
+
+    Con etag=True agrega GET condicional: el ETag es la versión de la colección
+    leída antes de armar el cuerpo, y se guarda en la entrada de L1 junto con
+    él, de modo que un hit responde (200 o 304) sin consultar Redis y nunca
+    envía un cuerpo anterior con un ETag más nuevo.
+    """
+    def decorator(f):
+        ttl_endpoint = L1_CACHE_ENDPOINTS.get(f.__name__, ttl)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            clave = (f.__name__, request.full_path)
+            generacion = cache.generacion(coleccion)
+            if ttl_endpoint > 0:
+                # Una entrada de una generación anterior se descarta y cuenta como miss
+                entrada = l1.get(clave, vigente=lambda entrada: entrada[0] == generacion)
+                if entrada is not None:
+                    _contar(f.__name__, "hits")
+                    _, cuerpo, mimetype, etag_entrada = entrada
+                    return _responder(cuerpo, mimetype, etag_entrada)
+                _contar(f.__name__, "misses")
+
+            etag_actual = None
+            if etag:
+                version = cache.version(coleccion)
+                if version is not None:
+                    etag_actual = f"{coleccion}-{version}"
+                    # El cliente ya tiene esta versión: 304 sin cargar datos
+                    if request.if_none_match.contains(etag_actual):
+                        return _responder(None, None, etag_actual)
+
+            respuesta = make_response(f(*args, **kwargs))
+            if respuesta.status_code != 200:
+                return respuesta
+            if etag_actual is not None:
+                respuesta.set_etag(etag_actual)
+            if ttl_endpoint > 0 and not respuesta.is_streamed:
+                cuerpo = respuesta.get_data()
+                # Si hubo una invalidación mientras se armaba la respuesta, no se guarda
+                if cache.generacion(coleccion) == generacion:
+                    l1.set(clave, (generacion, cuerpo, respuesta.mimetype, etag_actual), ttl_endpoint, tamano=len(cuerpo))
+            return respuesta
+        return decorated_function
+    return decorator
+
+
+def contar_accesos(coleccion, parametro):
+    """
+    Decorador que cuenta la lectura del registro indicado por el parámetro de la URL.
+    Debe ir por encima de cache_l1, para contar también los hits de L1.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            precalentamiento.registrar_acceso(coleccion, kwargs[parametro])
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def estadisticas():
+    """Ocupación y hit ratio de la cache L1, global y por endpoint (de este proceso)"""
+    with _contadores_lock:
+        endpoints = {}
+        for endpoint, contador in _contadores.items():
+            lecturas = contador["hits"] + contador["misses"]
+            endpoints[endpoint] = dict(contador, hit_ratio=round(contador["hits"] / lecturas, 4) if lecturas else 0.0)
+    return {"global": l1.stats(), "endpoints": endpoints}
@@ -0,0 +1,237 @@
+"""
+Motor de consultas para los endpoints de lista (filter, sort, fields).
+Los parámetros se compilan una vez por request en un predicado, un orden y
+una proyección, que se aplican de forma perezosa sobre la colección leída de
+a páginas (cacheadas). Si un filtro eq/in usa un campo con índice
+secundario, se recorre solo el índice en lugar de toda la colección.
+
+Parámetros:
+    filter=campo:op:valor   (repetible; se combinan con AND)
+        op: eq, ne, lt, lte, gt, gte, in (valores separados por |), prefix, contains
+        ej. filter=nombre:prefix:Diseño&filter=usuario_id:in:1|2|3
+    sort=campo,-campo       ('-' ordena descendente)
+    fields=id,nombre        (campos a incluir en cada registro)
+
+También resuelve la lectura de varios registros por id (?ids=1,2,3).
+"""
+import heapq
+import json
+from itertools import islice
+from flask import request, jsonify
+from middleware.auth import recursos_permitidos
+from controllers.paginacion import responder_lista, leer_paginacion, STREAM_CHUNK_SIZE, PAGINACION_MAX_LIMIT
+
+OPERADORES = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "prefix": lambda a, b: isinstance(a, str) and a.startswith(b),
+    "contains": lambda a, b: isinstance(a, str) and b in a,
+}
+OPERADORES_TEXTO = ("prefix", "contains")
+OPERADORES_INDICE = ("eq", "in")
+
+
+class Fuente:
+    """
+    Colección sobre la que se consulta.
+    - pagina(cursor, limit): registros con id mayor a cursor, ordenados por id
+    - indices: {campo: buscar(valor, cursor, limit)} para los campos con índice secundario
+    """
+
+    def __init__(self, pagina, indices=None):
+        self.pagina = pagina
+        self.indices = indices or {}
+
+
+def _valor(texto):
+    """Interpreta el valor de un filtro como JSON (números, true, null...) o como texto"""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def _compilar_filtro(expresion):
+    partes = expresion.split(":", 2)
+    if len(partes) != 3 or not partes[0] or partes[1] not in OPERADORES:
+        raise ValueError(f"Filtro inválido '{expresion}': se espera campo:op:valor con op en {', '.join(OPERADORES)}")
+    campo, op, texto = partes
+    if op == "in":
+        valor = [_valor(v) for v in texto.split("|")]
+        try:
+            valor = frozenset(valor)
+        except TypeError:
+            pass
+    elif op in OPERADORES_TEXTO:
+        valor = texto
+    else:
+        valor = _valor(texto)
+    return campo, op, valor
+
+
+def _clave_orden(valor):
+    """Clave comparable para cualquier valor JSON: números, luego textos, luego nulos"""
+    if valor is None:
+        return (2, "")
+    if isinstance(valor, (int, float)):
+        return (0, valor)
+    return (1, valor if isinstance(valor, str) else json.dumps(valor, sort_keys=True))
+
+
+class Consulta:
+    """Consulta compilada: filtros, orden y proyección"""
+
+    def __init__(self, filtros, orden, campos):
+        self.filtros = filtros
+        self.orden = orden
+        self.campos = campos
+        comparaciones = [(campo, OPERADORES[op], valor) for campo, op, valor in filtros]
+
+        def predicado(item):
+            for campo, comparar, valor in comparaciones:
+                try:
+                    if not comparar(item.get(campo), valor):
+                        return False
+                except TypeError:
+                    return False
+            return True
+
+        self.predicado = predicado
+
+    def ordena(self):
+        """Indica si el orden pedido es distinto del orden por id"""
+        return bool(self.orden) and self.orden != [("id", False)]
+
+    def proyectar(self, item):
+        if self.campos is None:
+            return item
+        return {campo: item[campo] for campo in self.campos if campo in item}
+
+    def ordenar(self, items):
+        items = list(items)
+        for campo, descendente in reversed(self.orden):
+            items.sort(key=lambda item: _clave_orden(item.get(campo)), reverse=descendente)
+        return items
+
+
+def compilar(args):
+    """Compila los parámetros del request; retorna None si no hay consulta. Lanza ValueError"""
+    expresiones = args.getlist("filter")
+    sort = args.get("sort")
+    fields = args.get("fields")
+    if not expresiones and sort is None and fields is None:
+        return None
+
+    filtros = [_compilar_filtro(expresion) for expresion in expresiones]
+    orden = []
+    for campo in (sort or "").split(","):
+        campo = campo.strip()
+        if campo:
+            orden.append((campo.lstrip("-"), campo.startswith("-")))
+    campos = None
+    if fields is not None:
+        campos = tuple(campo.strip() for campo in fields.split(",") if campo.strip())
+        if not campos:
+            raise ValueError("El parámetro 'fields' debe indicar al menos un campo")
+    return Consulta(filtros, orden, campos)
+
+
+def _recorrer(obtener_pagina, cursor):
+    """Itera los registros con id mayor a cursor leyendo de a STREAM_CHUNK_SIZE"""
+    while True:
+        pagina = obtener_pagina(cursor, STREAM_CHUNK_SIZE)
+        yield from pagina
+        if len(pagina) < STREAM_CHUNK_SIZE:
+            return
+        cursor = pagina[-1]["id"]
+
+
+def _origen(fuente, consulta, cursor):
+    """Registros candidatos en orden de id: del índice si algún filtro lo permite, si no la colección"""
+    for campo, op, valor in consulta.filtros:
+        buscar = fuente.indices.get(campo)
+        if buscar is None or op not in OPERADORES_INDICE:
+            continue
+        valores = sorted(valor, key=_clave_orden) if op == "in" else [valor]
+        if any(v is None or isinstance(v, (dict, list)) for v in valores):
+            continue   # el índice no guarda nulos ni valores anidados
+        recorridos = [_recorrer(lambda c, l, v=v: buscar(v, c, l), cursor) for v in valores]
+        return heapq.merge(*recorridos, key=lambda item: item["id"])
+    return _recorrer(fuente.pagina, cursor)
+
+
+def responder_consulta(fuente):
+    """
+    Responde un endpoint de lista aplicando filter/sort/fields si están presentes.
+    Sin orden explícito se mantiene la paginación por cursor; con sort se ordena
+    el resultado filtrado y se admite 'limit' pero no 'cursor'.
+    """
+    try:
+        consulta = compilar(request.args)
+        if consulta is None:
+            return responder_lista(fuente.pagina)
+        cursor, limit, _ = leer_paginacion()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if consulta.ordena():
+        if cursor is not None:
+            return jsonify({"error": "El parámetro 'cursor' no puede usarse junto con 'sort'"}), 400
+        items = consulta.ordenar(filter(consulta.predicado, _origen(fuente, consulta, None)))
+        if limit is not None:
+            items = items[:limit]
+        return jsonify({"data": [consulta.proyectar(item) for item in items], "next_cursor": None}), 200
+
+    def obtener_pagina(cursor, limit):
+        items = filter(consulta.predicado, _origen(fuente, consulta, cursor))
+        return list(items if limit is None else islice(items, limit))
+
+    return responder_lista(obtener_pagina, proyectar=consulta.proyectar)
+
+
+def leer_ids():
+    """Lee 'ids' del query string (enteros separados por coma, sin repetidos). Lanza ValueError"""
+    try:
+        ids = [int(valor) for valor in request.args.get("ids", "").split(",") if valor.strip()]
+    except ValueError:
+        raise ValueError("El parámetro 'ids' debe ser una lista de ids enteros separados por coma")
+    if not ids:
+        raise ValueError("El parámetro 'ids' debe indicar al menos un id")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > PAGINACION_MAX_LIMIT:
+        raise ValueError(f"Se admiten hasta {PAGINACION_MAX_LIMIT} ids por consulta")
+    return ids
+
+
+def responder_por_ids(obtener_por_ids, resource_key):
+    """
+    Responde GET /<coleccion>?ids=1,2,3 con los registros en el orden pedido.
+    - obtener_por_ids(ids): {id: registro} (un MGET a la cache y una lectura para los faltantes)
+    - resource_key: restricción del valet key que se valida para cada id; los ids
+      no permitidos van en 'denegados' sin leerse, los inexistentes en 'no_encontrados'
+    Admite 'fields'; no admite filter ni sort.
+    """
+    try:
+        ids = leer_ids()
+        consulta = compilar(request.args)
+        if consulta is not None and (consulta.filtros or consulta.orden):
+            raise ValueError("Los parámetros 'filter' y 'sort' no pueden usarse junto con 'ids'")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    permitidos = recursos_permitidos(resource_key)
+    denegados = [item_id for item_id in ids if permitidos is not None and item_id not in permitidos]
+    consultables = [item_id for item_id in ids if permitidos is None or item_id in permitidos]
+
+    encontrados = obtener_por_ids(consultables) if consultables else {}
+    proyectar = consulta.proyectar if consulta is not None else (lambda item: item)
+    return jsonify({
+        "data": [proyectar(encontrados[item_id]) for item_id in consultables if item_id in encontrados],
+        "no_encontrados": [item_id for item_id in consultables if item_id not in encontrados],
+        "denegados": denegados
+    }), 200
@@ -0,0 +1,80 @@
+"""
+Paginación por cursor (keyset sobre id) y respuestas en streaming
+para los endpoints de lista del monolito
+"""
+from flask import request, jsonify, Response
+import json
+import os
+
+PAGINACION_MAX_LIMIT = int(os.getenv("PAGINACION_MAX_LIMIT", "1000"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+
+
+def leer_paginacion():
+    """
+    Lee 'limit', 'cursor' y 'stream' del query string.
+    Retorna (cursor, limit, stream); lanza ValueError si son inválidos.
+    """
+    cursor = request.args.get("cursor", type=int)
+    limit = request.args.get("limit", type=int)
+    stream = request.args.get("stream", "false").lower() in ("1", "true", "si")
+
+    if "cursor" in request.args and cursor is None:
+        raise ValueError("El parámetro 'cursor' debe ser un id entero")
+    if "limit" in request.args and (limit is None or limit < 1):
+        raise ValueError("El parámetro 'limit' debe ser un entero positivo")
+
+    if limit is not None:
+        limit = min(limit, PAGINACION_MAX_LIMIT)
+    elif cursor is not None and not stream:
+        limit = PAGINACION_MAX_LIMIT
+    return cursor, limit, stream
+
+
+def _sin_proyeccion(item):
+    return item
+
+
+def _generar_lista(obtener_pagina, cursor, limit, proyectar=_sin_proyeccion):
+    """Escribe {"data": [...], "next_cursor": ...} de a una página por vez"""
+    yield '{"data": ['
+    enviados = 0
+    separador = ""
+    while limit is None or enviados < limit:
+        tam = STREAM_CHUNK_SIZE if limit is None else min(STREAM_CHUNK_SIZE, limit - enviados)
+        pagina = obtener_pagina(cursor, tam)
+        for item in pagina:
+            yield separador + json.dumps(proyectar(item))
+            separador = ","
+        enviados += len(pagina)
+        if len(pagina) < tam:
+            cursor = None
+            break
+        cursor = pagina[-1]["id"]
+    yield '], "next_cursor": ' + json.dumps(cursor) + '}'
+
+
+def responder_lista(obtener_pagina, proyectar=_sin_proyeccion):
+    """
+    Construye la respuesta de un endpoint de lista.
+    - obtener_pagina(cursor, limit): registros con id mayor a cursor, hasta limit
+    - proyectar(item): registro a incluir en la respuesta (el cursor se toma antes de proyectar)
+    - Sin parámetros responde la colección completa, como antes
+    - Con 'limit'/'cursor' responde una página y el 'next_cursor' siguiente
+    - Con 'stream=true' escribe el arreglo incrementalmente mediante un generador
+    """
+    try:
+        cursor, limit, stream = leer_paginacion()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if stream:
+        return Response(_generar_lista(obtener_pagina, cursor, limit, proyectar), mimetype="application/json"), 200
+
+    if limit is None:
+        return jsonify({"data": [proyectar(item) for item in obtener_pagina(None, None)]}), 200
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    pagina = obtener_pagina(cursor, limit + 1)
+    next_cursor = pagina[limit - 1]["id"] if len(pagina) > limit else None
+    return jsonify({"data": [proyectar(item) for item in pagina[:limit]], "next_cursor": next_cursor}), 200
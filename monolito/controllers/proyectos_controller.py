@@ -2,68 +2,35 @@
 Blueprint de proyectos para el monolito
 """
 from flask import Blueprint, request, jsonify
-import json
-import os
-import time
-import redis
-from middleware.auth import valet_key_required
-from services.usuarios_service import get_usuarios
+from middleware.auth import valet_key_required, recursos_permitidos
+from services.circuit_breaker import CircuitoAbierto
+from services import circuit_breaker
+from services.usuarios_service import usuario_exists, usuarios_existentes
+from services import proyectos_service
+from controllers.paginacion import responder_lista
+from controllers.consultas import Fuente, responder_consulta, responder_por_ids
+from controllers.cache_respuestas import cache_l1, contar_accesos
+from controllers.bulk import leer_items_bulk, item_ok, item_error, responder_bulk
 
 proyectos_bp = Blueprint('proyectos', __name__)
 
-DATA_FILE = "proyectos.json"
-CIRCUIT_FILE = "circuit_state.json"
+breaker_usuarios = circuit_breaker.obtener("usuarios")
 
-FAIL_THRESHOLD = 3
-RESET_TIMEOUT = 10
-
-cache = redis.Redis(host="redis", port=6379, decode_responses=True)
-CACHE_TTL = 30  # segundos que los datos duran en cache
-
-# Crear archivo JSON si no existe
-if not os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "w") as f:
-        json.dump([], f)
-
-# Inicializar archivo de circuito
-if not os.path.exists(CIRCUIT_FILE):
-    with open(CIRCUIT_FILE, "w") as f:
-        json.dump({"fail_count": 0, "circuit_open": False, "last_failure_time": 0}, f)
-
-
-def read_circuit_state():
-    with open(CIRCUIT_FILE) as f:
-        return json.load(f)
-
-
-def write_circuit_state(state):
-    with open(CIRCUIT_FILE, "w") as f:
-        json.dump(state, f)
+FUENTE_PROYECTOS = Fuente(proyectos_service.get_proyectos_pagina,
+                          indices={"usuario_id": proyectos_service.get_proyectos_por_usuario})
 
 
 @proyectos_bp.route("/proyectos/<int:proyecto_id>", methods=["GET"])
 @valet_key_required(scope="read:proyectos", resource_key="proyecto_id", method="GET")
+@contar_accesos("proyectos", "proyecto_id")
+@cache_l1("proyectos")
 def get_proyecto_by_id(proyecto_id):
     try:
-        # 1️⃣ Buscar en cache
-        cache_key = f"proyecto:{proyecto_id}"
-        cached_proyecto = cache.get(cache_key)
-        if cached_proyecto:
-            print(f"Cache hit -> proyecto {proyecto_id}")
-            return jsonify(json.loads(cached_proyecto)), 200
-
-        # 2️⃣ Si no está en cache, leer del archivo
-        print(f"Cache miss -> leyendo proyecto {proyecto_id} del archivo")
-        with open(DATA_FILE) as f:
-            proyectos = json.load(f)
-
-        proyecto = next((p for p in proyectos if p["id"] == proyecto_id), None)
+        # Cache-aside: el servicio lee de Redis y solo ante un miss del repositorio
+        proyecto = proyectos_service.get_proyecto_by_id(proyecto_id)
         if not proyecto:
             return jsonify({"error": "Proyecto no encontrado"}), 404
 
-        # 3️⃣ Guardar en cache
-        cache.setex(cache_key, CACHE_TTL, json.dumps(proyecto))
-
         return jsonify(proyecto), 200
 
     except Exception as e:
@@ -71,61 +38,134 @@ def get_proyecto_by_id(proyecto_id):
         return jsonify({"error": "No se pudo obtener el proyecto"}), 500
 
 
-@proyectos_bp.route("/proyectos", methods=["GET"])
+@cache_l1("proyectos", etag=True)
 def get_all_proyectos():
     try:
-        with open(DATA_FILE) as f:
-            proyectos = json.load(f)
-        return jsonify({"data": proyectos}), 200
+        return responder_consulta(FUENTE_PROYECTOS)
     except Exception as e:
         return jsonify({"error": f"No se pudieron obtener los proyectos: {str(e)}"}), 500
 
 
+@valet_key_required(scope="read:proyectos", method="GET")
+def get_proyectos_por_ids():
+    # Sin cache L1 ni ETag: la respuesta depende de las restricciones del valet key
+    try:
+        return responder_por_ids(proyectos_service.get_proyectos_por_ids, "proyecto_id")
+    except Exception as e:
+        return jsonify({"error": f"No se pudieron obtener los proyectos: {str(e)}"}), 500
+
+
+@proyectos_bp.route("/proyectos", methods=["GET"])
+def listar_proyectos():
+    """Lista de proyectos, o varios proyectos por id con ?ids=1,2,3"""
+    if "ids" in request.args:
+        return get_proyectos_por_ids()
+    return get_all_proyectos()
+
+
+@proyectos_bp.route("/usuarios/<int:usuario_id>/proyectos", methods=["GET"])
+@valet_key_required(scope="read:proyectos", resource_key="usuario_id", method="GET")
+def get_proyectos_de_usuario(usuario_id):
+    """
+    Proyectos de un usuario, resueltos con el índice secundario por usuario_id.
+    Un valet key restringido a ciertos proyecto_id solo ve esos proyectos; como la
+    respuesta depende del valet key, este endpoint no usa la cache L1 ni ETag.
+    """
+    try:
+        existe, error = consultar_usuarios(lambda: usuario_exists(usuario_id))
+        if error:
+            return error
+        if not existe:
+            return jsonify({"error": "Usuario no encontrado"}), 404
+
+        permitidos = recursos_permitidos("proyecto_id")
+
+        def obtener_pagina(cursor, limit):
+            if permitidos is None:
+                return proyectos_service.get_proyectos_por_usuario(usuario_id, cursor, limit)
+            proyectos = [p for p in proyectos_service.get_proyectos_por_usuario(usuario_id, cursor)
+                         if p["id"] in permitidos]
+            return proyectos if limit is None else proyectos[:limit]
+
+        return responder_lista(obtener_pagina)
+    except Exception as e:
+        return jsonify({"error": f"No se pudieron obtener los proyectos: {str(e)}"}), 500
+
+
+def consultar_usuarios(consulta):
+    """
+    Ejecuta una consulta al módulo de usuarios protegida por el circuit breaker.
+    Retorna (resultado, None) si tuvo éxito o (None, respuesta_de_error) si no.
+    """
+    try:
+        # En el monolito, acceso directo a datos (sin HTTP)
+        return breaker_usuarios.llamar(consulta), None
+    except CircuitoAbierto as e:
+        return None, (jsonify({"error": str(e)}), 503)
+    except Exception:
+        return None, (jsonify({"error": "Servicio de usuarios no disponible"}), 503)
+
+
 @proyectos_bp.route("/proyectos", methods=["POST"])
 @valet_key_required(scope="write:proyectos", method="POST")
 def add_proyecto():
-    state = read_circuit_state()
     data = request.json
 
     if not data or not data.get("nombre") or not data.get("usuario_id"):
         return jsonify({"error": "Campos 'nombre' y 'usuario_id' son obligatorios"}), 400
 
-    # --- Circuit Breaker Logic ---
-    if state["circuit_open"]:
-        if time.time() - state["last_failure_time"] < RESET_TIMEOUT:
-            return jsonify({"error": "Circuito abierto: servicio de usuarios no disponible temporalmente"}), 503
-        else:
-            # Reinicia el circuito después del timeout
-            state.update({"fail_count": 0, "circuit_open": False})
-            write_circuit_state(state)
-
-    try:
-        # En el monolito, acceso directo a datos (sin HTTP)
-        usuarios = get_usuarios()
-
-        # Resetea el circuito si todo va bien
-        state.update({"fail_count": 0, "circuit_open": False})
-        write_circuit_state(state)
-
-    except Exception as e:
-        state["fail_count"] += 1
-        state["last_failure_time"] = time.time()
-        if state["fail_count"] >= FAIL_THRESHOLD:
-            state["circuit_open"] = True
-            print("⚠️ Circuit breaker abierto: demasiadas fallas en usuarios-service.")
-        write_circuit_state(state)
-        return jsonify({"error": "Servicio de usuarios no disponible"}), 503
+    usuario_valido, error = consultar_usuarios(lambda: usuario_exists(data["usuario_id"]))
+    if error:
+        return error
 
     # Validar usuario existente
-    if not any(u["id"] == data["usuario_id"] for u in usuarios):
+    if not usuario_valido:
         return jsonify({"error": "Usuario no encontrado"}), 400
 
     # Guardar proyecto
-    with open(DATA_FILE) as f:
-        proyectos = json.load(f)
-    data["id"] = (proyectos[-1]["id"] + 1) if proyectos else 1
-    proyectos.append(data)
-    with open(DATA_FILE, "w") as f:
-        json.dump(proyectos, f, indent=4)
+    proyectos_service.add_proyecto(data)
 
     return jsonify({"mensaje": "Proyecto creado exitosamente", "data": data}), 201
+
+
+@proyectos_bp.route("/proyectos/bulk", methods=["POST"])
+@valet_key_required(scope="write:proyectos", method="POST")
+def add_proyectos_bulk():
+    """
+    Alta masiva de proyectos. Valida todos los usuario_id contra un único
+    conjunto de usuarios existentes y persiste los válidos en una sola escritura.
+    """
+    try:
+        items = leer_items_bulk()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        resultados = [None] * len(items)
+        candidatos = []
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get("nombre") or not isinstance(item.get("usuario_id"), int):
+                resultados[i] = item_error(i, "Campos 'nombre' y 'usuario_id' (entero) son obligatorios")
+            else:
+                candidatos.append((i, item))
+
+        ids = {item["usuario_id"] for _, item in candidatos}
+        existentes, error = consultar_usuarios(lambda: usuarios_existentes(ids))
+        if error:
+            return error
+
+        validos = []
+        for i, item in candidatos:
+            if item["usuario_id"] in existentes:
+                validos.append((i, item))
+            else:
+                resultados[i] = item_error(i, "Usuario no encontrado")
+
+        if validos:
+            proyectos_service.add_proyectos([item for _, item in validos])
+        for i, item in validos:
+            resultados[i] = item_ok(i, item)
+
+        return responder_bulk(resultados, "Alta masiva de proyectos procesada")
+    except Exception as e:
+        return jsonify({"error": f"No se pudieron crear los proyectos: {str(e)}"}), 500
@@ -1,132 +1,225 @@
 """
-Blueprint SOAP para el monolito
-Implementa un servicio SOAP con XML para consultar estadísticas
+Servicio SOAP del monolito
+Implementa un servicio SOAP con XML para consultar estadísticas.
+La aplicación spyne se monta directamente como WSGI en /soap (ver app.py),
+de modo que su respuesta llega al servidor sin copias intermedias.
+
+Los documentos XML de cada operación se construyen con lxml. Las
+operaciones retornan Unicode, por lo que spyne serializa el documento
+completo dentro del sobre SOAP; por eso ninguna operación incluye
+colecciones completas. El volcado de registros es GET /estadisticas/registros,
+que escribe el XML con etree.xmlfile y lo envía de a páginas, con memoria
+acotada sin importar el tamaño de la colección.
+
+Las operaciones por lote (obtener_proyectos_por_ids, listar_proyectos)
+retornan tipos de spyne (ComplexModel) y resuelven todos los ids contra
+una sola lectura del repositorio.
 """
-from flask import Blueprint, request, Response
-from spyne import Application, rpc, ServiceBase, Unicode, Integer
+from spyne import Application, rpc, ServiceBase, Unicode, Integer, ComplexModel, Array, Fault
 from spyne.protocol.soap import Soap11
 from spyne.server.wsgi import WsgiApplication
+from flask import Blueprint, Response, request, jsonify
+from datetime import datetime
+from lxml import etree
+from lxml.builder import E
 import json
-import os
+from services import proyectos_service, tareas_service, usuarios_service, circuit_breaker, estadisticas
+from middleware.auth import gatekeeper_required, get_auth_context, validate_valet_key_permissions
+from controllers.paginacion import STREAM_CHUNK_SIZE, PAGINACION_MAX_LIMIT
+
+# Colecciones que pueden listarse: (nombre del elemento de cada registro, lectura paginada)
+LISTADOS = {
+    "proyectos": ("proyecto", proyectos_service.get_proyectos_pagina),
+    "tareas": ("tarea", tareas_service.get_tareas_pagina),
+    "usuarios": ("usuario", usuarios_service.get_usuarios_pagina),
+}
+
+
+class Proyecto(ComplexModel):
+    """Proyecto tipado para las operaciones por lote"""
+    __namespace__ = 'estadisticas'
+    id = Integer
+    nombre = Unicode
+    usuario_id = Integer
+    descripcion = Unicode
+
+
+class PaginaProyectos(ComplexModel):
+    """Página de proyectos; next_cursor es nulo en la última página"""
+    __namespace__ = 'estadisticas'
+    proyectos = Array(Proyecto)
+    next_cursor = Integer
+
+
+def _proyecto_tipado(proyecto):
+    return Proyecto(
+        id=proyecto.get('id'),
+        nombre=_texto(proyecto.get('nombre')),
+        usuario_id=proyecto.get('usuario_id') if isinstance(proyecto.get('usuario_id'), int) else None,
+        descripcion=_texto(proyecto['descripcion']) if proyecto.get('descripcion') is not None else None
+    )
+
+
+class _Fragmentos(list):
+    """Destino de etree.xmlfile que junta los fragmentos escritos hasta enviarlos"""
+    write = list.append
+
+    def vaciar(self):
+        fragmento = b"".join(self)
+        self.clear()
+        return fragmento
+
+
+def _documento(elemento):
+    """Serializa un elemento como documento XML"""
+    return etree.tostring(elemento, xml_declaration=True, encoding="UTF-8").decode("utf-8")
+
+
+def _error(mensaje):
+    return _documento(E.error(E.mensaje(mensaje)))
+
+
+def _texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor)
+    return str(valor)
+
+
+def _elemento_registro(etiqueta, registro):
+    """Convierte un registro en un elemento; los campos que no son nombres XML válidos van como <campo nombre="...">"""
+    elemento = etree.Element(etiqueta)
+    for clave, valor in registro.items():
+        try:
+            hijo = etree.SubElement(elemento, clave)
+        except ValueError:
+            hijo = etree.SubElement(elemento, "campo", nombre=clave)
+        hijo.text = _texto(valor)
+    return elemento
+
+
+def _paginas(coleccion):
+    """Recorre los registros de la colección página por página"""
+    _, obtener_pagina = LISTADOS[coleccion]
+    breaker = circuit_breaker.obtener(coleccion)
+    cursor = None
+    while True:
+        pagina = breaker.llamar(obtener_pagina, cursor, STREAM_CHUNK_SIZE)
+        yield pagina
+        if len(pagina) < STREAM_CHUNK_SIZE:
+            return
+        cursor = pagina[-1]["id"]
+
+
+def _colecciones(tipo):
+    return [c for c in ("proyectos", "tareas", "usuarios") if tipo == c or tipo == 'general']
 
-soap_bp = Blueprint('soap', __name__)
 
 # Definir el servicio SOAP
 class EstadisticasService(ServiceBase):
     """Servicio SOAP para obtener estadísticas del sistema"""
-    
+
     @rpc(Unicode, _returns=Unicode)
     def obtener_estadisticas(ctx, tipo):
         """
-        Obtiene estadísticas del sistema según el tipo solicitado
-        
+        Obtiene estadísticas del sistema según el tipo solicitado.
+        Los totales salen de contadores materializados en Redis (O(1));
+        los registros completos se obtienen con GET /estadisticas/registros.
+
         Args:
             tipo: Tipo de estadística ('proyectos', 'tareas', 'usuarios', 'general')
-        
+
         Returns:
             XML con las estadísticas solicitadas
         """
         try:
-            estadisticas = {}
-            
-            if tipo == 'proyectos' or tipo == 'general':
-                proyectos_file = "proyectos.json"
-                if os.path.exists(proyectos_file):
-                    with open(proyectos_file) as f:
-                        proyectos = json.load(f)
-                    estadisticas['total_proyectos'] = len(proyectos)
-                    estadisticas['proyectos'] = proyectos
-                else:
-                    estadisticas['total_proyectos'] = 0
-                    estadisticas['proyectos'] = []
-            
-            if tipo == 'tareas' or tipo == 'general':
-                tareas_file = "tareas.json"
-                if os.path.exists(tareas_file):
-                    with open(tareas_file) as f:
-                        tareas = json.load(f)
-                    estadisticas['total_tareas'] = len(tareas)
-                    estadisticas['tareas'] = tareas
-                else:
-                    estadisticas['total_tareas'] = 0
-                    estadisticas['tareas'] = []
-            
-            if tipo == 'usuarios' or tipo == 'general':
-                usuarios_file = "usuarios.json"
-                if os.path.exists(usuarios_file):
-                    with open(usuarios_file) as f:
-                        usuarios = json.load(f)
-                    estadisticas['total_usuarios'] = len(usuarios)
-                    estadisticas['usuarios'] = usuarios
-                else:
-                    estadisticas['total_usuarios'] = 0
-                    estadisticas['usuarios'] = []
-            
-            # Convertir a XML manualmente para mantener compatibilidad
-            xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<estadisticas>
-    <tipo>{tipo}</tipo>
-    <total_proyectos>{estadisticas.get('total_proyectos', 0)}</total_proyectos>
-    <total_tareas>{estadisticas.get('total_tareas', 0)}</total_tareas>
-    <total_usuarios>{estadisticas.get('total_usuarios', 0)}</total_usuarios>
-    <timestamp>{json.dumps(estadisticas)}</timestamp>
-</estadisticas>"""
-            
-            return xml_response
-            
+            colecciones = _colecciones(tipo)
+            # Solo se lee el desglose que se incluye en la respuesta
+            contadores = estadisticas.obtener(desgloses=[c for c in ("tareas",) if c in colecciones])
+            totales = contadores["totales"]
+
+            documento = E.estadisticas(E.tipo(_texto(tipo)))
+            for coleccion in ("proyectos", "tareas", "usuarios"):
+                total = totales[coleccion] if coleccion in colecciones else 0
+                documento.append(E(f"total_{coleccion}", str(total)))
+            if "tareas" in colecciones:
+                documento.append(E.tareas_por_proyecto(*[
+                    E.proyecto(str(cantidad), id=proyecto_id)
+                    for proyecto_id, cantidad in sorted(contadores["tareas_por_proyecto"].items())
+                ]))
+            documento.append(E.timestamp(datetime.now().isoformat()))
+            return _documento(documento)
+
         except Exception as e:
-            error_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<error>
-    <mensaje>Error al obtener estadísticas: {str(e)}</mensaje>
-</error>"""
-            return error_xml
-    
+            return _error(f"Error al obtener estadísticas: {str(e)}")
+
     @rpc(Integer, _returns=Unicode)
     def obtener_proyecto_por_id(ctx, proyecto_id):
         """
         Obtiene un proyecto específico por su ID en formato XML
-        
+
         Args:
             proyecto_id: ID del proyecto a consultar
-        
+
         Returns:
             XML con la información del proyecto
         """
         try:
-            proyectos_file = "proyectos.json"
-            if not os.path.exists(proyectos_file):
-                return """<?xml version="1.0" encoding="UTF-8"?>
-<error>
-    <mensaje>Archivo de proyectos no encontrado</mensaje>
-</error>"""
-            
-            with open(proyectos_file) as f:
-                proyectos = json.load(f)
-            
-            proyecto = next((p for p in proyectos if p.get("id") == proyecto_id), None)
-            
+            with circuit_breaker.obtener("proyectos"):
+                proyecto = proyectos_service.get_proyecto_by_id(proyecto_id)
+
             if not proyecto:
-                return f"""<?xml version="1.0" encoding="UTF-8"?>
-<error>
-    <mensaje>Proyecto con ID {proyecto_id} no encontrado</mensaje>
-</error>"""
-            
-            xml_response = f"""<?xml version="1.0" encoding="UTF-8"?>
-<proyecto>
-    <id>{proyecto.get('id', '')}</id>
-    <nombre>{proyecto.get('nombre', '')}</nombre>
-    <usuario_id>{proyecto.get('usuario_id', '')}</usuario_id>
-    <descripcion>{proyecto.get('descripcion', '')}</descripcion>
-</proyecto>"""
-            
-            return xml_response
-            
+                return _error(f"Proyecto con ID {proyecto_id} no encontrado")
+
+            return _documento(E.proyecto(
+                E.id(_texto(proyecto.get('id', ''))),
+                E.nombre(_texto(proyecto.get('nombre', ''))),
+                E.usuario_id(_texto(proyecto.get('usuario_id', ''))),
+                E.descripcion(_texto(proyecto.get('descripcion', '')))
+            ))
+
+        except Exception as e:
+            return _error(f"Error al obtener proyecto: {str(e)}")
+
+    @rpc(Array(Integer), _returns=Array(Proyecto))
+    def obtener_proyectos_por_ids(ctx, ids):
+        """
+        Obtiene varios proyectos en una sola llamada, en el orden pedido.
+        Los ids inexistentes se omiten.
+
+        Args:
+            ids: lista de IDs (hasta PAGINACION_MAX_LIMIT)
+        """
+        ids = [proyecto_id for proyecto_id in (ids or []) if proyecto_id is not None]
+        if len(ids) > PAGINACION_MAX_LIMIT:
+            raise Fault('Client', f"Se admiten hasta {PAGINACION_MAX_LIMIT} ids por llamada")
+        try:
+            encontrados = circuit_breaker.obtener("proyectos").llamar(proyectos_service.get_proyectos_por_ids, ids)
+        except Exception as e:
+            raise Fault('Server', f"Error al obtener proyectos: {str(e)}")
+        return [_proyecto_tipado(encontrados[proyecto_id]) for proyecto_id in ids if proyecto_id in encontrados]
+
+    @rpc(Integer, Integer, _returns=PaginaProyectos)
+    def listar_proyectos(ctx, cursor, limit):
+        """
+        Lista proyectos paginando por cursor (id del último proyecto recibido).
+
+        Args:
+            cursor: id a partir del cual continuar (vacío para la primera página)
+            limit: cantidad de proyectos por página (hasta PAGINACION_MAX_LIMIT)
+        """
+        limit = PAGINACION_MAX_LIMIT if limit is None else min(limit, PAGINACION_MAX_LIMIT)
+        if limit < 1:
+            raise Fault('Client', "El parámetro 'limit' debe ser un entero positivo")
+        try:
+            # Se pide un registro extra para saber si existe una página siguiente
+            pagina = circuit_breaker.obtener("proyectos").llamar(
+                proyectos_service.get_proyectos_pagina, cursor, limit + 1)
         except Exception as e:
-            error_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
-<error>
-    <mensaje>Error al obtener proyecto: {str(e)}</mensaje>
-</error>"""
-            return error_xml
+            raise Fault('Server', f"Error al listar proyectos: {str(e)}")
+        next_cursor = pagina[limit - 1]["id"] if len(pagina) > limit else None
+        return PaginaProyectos(proyectos=[_proyecto_tipado(p) for p in pagina[:limit]], next_cursor=next_cursor)
 
 
 # Crear aplicación SOAP
@@ -137,31 +230,52 @@ soap_app = Application(
     out_protocol=Soap11()
 )
 
-# Crear aplicación WSGI
+# Aplicación WSGI, montada en /soap por app.py
 soap_wsgi = WsgiApplication(soap_app)
 
-# Registrar ruta SOAP
-@soap_bp.route('/soap', methods=['POST', 'GET'])
-def soap_service():
-    """Endpoint SOAP para consultar estadísticas"""
-    status_headers = [None, None]
-    
-    def start_response(status, headers):
-        status_headers[0] = status
-        status_headers[1] = headers
-    
-    response = soap_wsgi(request.environ, start_response)
-    
-    # Convertir respuesta WSGI a string
-    response_body = b''.join(response).decode('utf-8')
-    
-    # Crear respuesta Flask
-    flask_response = Response(response_body, mimetype='text/xml; charset=utf-8')
-    
-    # Copiar headers si existen
-    if status_headers[1]:
-        for header, value in status_headers[1]:
-            flask_response.headers[header] = value
-    
-    return flask_response
 
+# Volcado de registros en streaming (fuera de SOAP), montado por app.py
+registros_bp = Blueprint('registros', __name__)
+
+
+def _generar_registros(colecciones):
+    """Escribe <registros> con etree.xmlfile y envía lo escrito después de cada página"""
+    destino = _Fragmentos()
+    try:
+        with etree.xmlfile(destino, encoding="UTF-8", buffered=False) as xf:
+            xf.write_declaration()
+            with xf.element("registros"):
+                for coleccion in colecciones:
+                    etiqueta = LISTADOS[coleccion][0]
+                    with xf.element(coleccion):
+                        for pagina in _paginas(coleccion):
+                            for registro in pagina:
+                                xf.write(_elemento_registro(etiqueta, registro))
+                            yield destino.vaciar()
+        yield destino.vaciar()
+    except Exception as e:
+        # Los encabezados ya se enviaron: el documento queda truncado
+        print(f"Error al volcar registros: {e}")
+
+
+@registros_bp.route("/estadisticas/registros", methods=["GET"])
+@gatekeeper_required
+def volcar_registros():
+    """
+    Registros completos en XML (?tipo=proyectos|tareas|usuarios|general), generados
+    de a páginas: la memoria no depende del tamaño de la colección
+    """
+    tipo = request.args.get("tipo", "general")
+    colecciones = _colecciones(tipo)
+    if not colecciones:
+        return jsonify({"error": "El parámetro 'tipo' debe ser proyectos, tareas, usuarios o general"}), 400
+
+    contexto = get_auth_context()
+    if contexto.tipo == "valet_key":
+        for coleccion in colecciones:
+            valido, error = validate_valet_key_permissions(
+                contexto.token, required_scope=f"read:{coleccion}", required_method="GET", contexto=contexto)
+            if not valido:
+                return jsonify({"error": error}), 403
+
+    return Response(_generar_registros(colecciones), mimetype="application/xml")
@@ -2,34 +2,50 @@
 Blueprint de tareas para el monolito
 """
 from flask import Blueprint, request, jsonify
-import json
-import os
-import redis
-import time
 from middleware.auth import valet_key_required
-from services.proyectos_service import get_proyecto_by_id
+from services.proyectos_service import get_proyecto_by_id, proyecto_exists, proyectos_existentes
+from services import tareas_service, cola_tareas, circuit_breaker
+from services.circuit_breaker import CircuitoAbierto
+from controllers.paginacion import responder_lista
+from controllers.consultas import Fuente, responder_consulta
+from controllers.cache_respuestas import cache_l1
+from controllers.bulk import leer_items_bulk, item_ok, item_error, responder_bulk
 
 tareas_bp = Blueprint('tareas', __name__)
 
-DATA_FILE = "tareas.json"
+breaker_proyectos = circuit_breaker.obtener("proyectos")
 
-# Conexión a Redis (cola de tareas)
-queue = redis.Redis(host="redis", port=6379, decode_responses=True)
-QUEUE_KEY = "tareas_pendientes"
-
-# Crear archivo si no existe
-if not os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "w") as f:
-        json.dump([], f)
+FUENTE_TAREAS = Fuente(tareas_service.get_tareas_pagina,
+                       indices={"proyecto_id": tareas_service.get_tareas_por_proyecto})
 
 
 @tareas_bp.route("/tareas", methods=["GET"])
 @valet_key_required(scope="read:tareas", method="GET")
+@cache_l1("tareas", etag=True)
 def get_tareas():
     try:
-        with open(DATA_FILE) as f:
-            tareas = json.load(f)
-        return jsonify({"data": tareas}), 200
+        return responder_consulta(FUENTE_TAREAS)
+    except Exception as e:
+        return jsonify({"error": f"Error al leer tareas: {str(e)}"}), 500
+
+
+@tareas_bp.route("/proyectos/<int:proyecto_id>/tareas", methods=["GET"])
+@valet_key_required(scope="read:tareas", resource_key="proyecto_id", method="GET")
+@cache_l1("tareas", etag=True)
+def get_tareas_de_proyecto(proyecto_id):
+    """Tareas de un proyecto, resueltas con el índice secundario por proyecto_id"""
+    try:
+        try:
+            existe = breaker_proyectos.llamar(proyecto_exists, proyecto_id)
+        except CircuitoAbierto as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception:
+            return jsonify({"error": "Servicio de proyectos no disponible"}), 503
+        if not existe:
+            return jsonify({"error": "Proyecto no encontrado"}), 404
+
+        return responder_lista(
+            lambda cursor, limit: tareas_service.get_tareas_por_proyecto(proyecto_id, cursor, limit))
     except Exception as e:
         return jsonify({"error": f"Error al leer tareas: {str(e)}"}), 500
 
@@ -46,14 +62,16 @@ def enqueue_tarea():
 
         # En el monolito, acceso directo a datos (sin HTTP)
         try:
-            proyecto = get_proyecto_by_id(data['proyecto_id'])
+            proyecto = breaker_proyectos.llamar(get_proyecto_by_id, data['proyecto_id'])
             if not proyecto:
                 return jsonify({"error": "Proyecto no encontrado"}), 404
+        except CircuitoAbierto as e:
+            return jsonify({"error": str(e)}), 503
         except Exception:
             return jsonify({"error": "Servicio de proyectos no disponible"}), 503
 
         # Enviar tarea a la cola (Redis)
-        queue.rpush(QUEUE_KEY, json.dumps(data))
+        cola_tareas.encolar_tarea(data)
         print(f"📩 Tarea encolada: {data}")
 
         return jsonify({"mensaje": "Tarea encolada correctamente"}), 202
@@ -62,28 +80,76 @@ def enqueue_tarea():
         return jsonify({"error": f"No se pudo encolar la tarea: {str(e)}"}), 500
 
 
-@tareas_bp.route("/procesar_tareas", methods=["POST"])
+@tareas_bp.route("/tareas/bulk", methods=["POST"])
 @valet_key_required(scope="write:tareas", method="POST")
-def procesar_tareas():
-    procesadas = []
-    while queue.llen(QUEUE_KEY) > 0:
-        tarea_json = queue.lpop(QUEUE_KEY)
-        if not tarea_json:
-            break
+def enqueue_tareas_bulk():
+    """
+    Encolado masivo de tareas. Valida todos los proyecto_id contra un único
+    conjunto de proyectos existentes y encola las válidas con un solo RPUSH.
+    """
+    try:
+        items = leer_items_bulk()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        tarea = json.loads(tarea_json)
-        print(f"⚙️ Procesando tarea: {tarea['nombre']}")
-        time.sleep(2)  # simula tiempo de ejecución
+    try:
+        resultados = [None] * len(items)
+        candidatos = []
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get("nombre") or not isinstance(item.get("proyecto_id"), int):
+                resultados[i] = item_error(i, "Campos 'nombre' y 'proyecto_id' (entero) son obligatorios")
+            else:
+                candidatos.append((i, item))
 
-        with open(DATA_FILE) as f:
-            tareas = json.load(f)
+        try:
+            existentes = breaker_proyectos.llamar(
+                proyectos_existentes, {item["proyecto_id"] for _, item in candidatos})
+        except CircuitoAbierto as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception:
+            return jsonify({"error": "Servicio de proyectos no disponible"}), 503
 
-        tarea["id"] = (tareas[-1]["id"] + 1) if tareas else 1
-        tareas.append(tarea)
+        validos = []
+        for i, item in candidatos:
+            if item["proyecto_id"] in existentes:
+                validos.append((i, item))
+            else:
+                resultados[i] = item_error(i, "Proyecto no encontrado")
 
-        with open(DATA_FILE, "w") as f:
-            json.dump(tareas, f, indent=4)
+        cola_tareas.encolar_tareas([item for _, item in validos])
+        for i, item in validos:
+            resultados[i] = item_ok(i, item)
+        print(f"📩 {len(validos)} tareas encoladas en lote")
+
+        return responder_bulk(resultados, "Tareas encoladas en lote", status_ok=202)
+    except Exception as e:
+        return jsonify({"error": f"No se pudieron encolar las tareas: {str(e)}"}), 500
+
+
+@tareas_bp.route("/procesar_tareas", methods=["POST"])
+@valet_key_required(scope="write:tareas", method="POST")
+def procesar_tareas():
+    """
+    Dispara el procesamiento de la cola sin bloquear y retorna su estado.
+    Las tareas las consumen los workers dedicados (python -m worker); si no
+    hay ninguno activo, la cola se drena en segundo plano en este proceso.
+    """
+    try:
+        drenado_local = cola_tareas.disparar_procesamiento()
+        return jsonify({
+            "mensaje": "Procesamiento de tareas en curso",
+            "drenado_local": drenado_local,
+            "estado": cola_tareas.estado_cola()
+        }), 202
+    except Exception as e:
+        return jsonify({"error": f"No se pudo consultar la cola: {str(e)}"}), 500
 
-        procesadas.append(tarea)
 
-    return jsonify({"mensaje": "Tareas procesadas", "data": procesadas}), 200
+@tareas_bp.route("/tareas/cola", methods=["GET"])
+@valet_key_required(scope="read:tareas", method="GET")
+def estado_cola():
+    """Estado de la cola de tareas (solo lectura: no dispara el procesamiento)"""
+    try:
+        return jsonify(cola_tareas.estado_cola()), 200
+    except Exception as e:
+        return jsonify({"error": f"No se pudo consultar la cola: {str(e)}"}), 500
@@ -3,7 +3,6 @@ Blueprint de usuarios para el monolito
 """
 from flask import Blueprint, request, jsonify
 import json
-import os
 import secrets
 from datetime import datetime, timedelta
 from middleware.auth import (
@@ -11,31 +10,48 @@ from middleware.auth import (
     valet_key_required, 
     get_token_from_request,
     get_valet_key_metadata,
+    get_auth_context,
+    invalidar_token,
     redis_client,
-    TOKENS_FILE
+    token_store,
+    TOKEN_TTL,
+    INTERNAL_SERVICE_TOKEN
 )
+from services import usuarios_service, valet_keys
+from controllers.consultas import Fuente, responder_consulta, responder_por_ids
+from controllers.cache_respuestas import cache_l1
+from controllers.bulk import leer_items_bulk, item_ok, item_error, responder_bulk
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
-DATA_FILE = "usuarios.json"
+FUENTE_USUARIOS = Fuente(usuarios_service.get_usuarios_pagina)
 
-# Crear archivo si no existe
-if not os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "w") as f:
-        json.dump([], f)
 
-
-@usuarios_bp.route("/usuarios", methods=["GET"])
-@valet_key_required(scope="read:usuarios", method="GET")
+@cache_l1("usuarios", etag=True)
 def get_usuarios():
     try:
-        with open(DATA_FILE) as f:
-            usuarios = json.load(f)
-        return jsonify({"data": usuarios}), 200
+        return responder_consulta(FUENTE_USUARIOS)
+    except Exception as e:
+        return jsonify({"error": f"Error al leer usuarios: {str(e)}"}), 500
+
+
+def get_usuarios_por_ids():
+    # Sin cache L1 ni ETag: la respuesta depende de las restricciones del valet key
+    try:
+        return responder_por_ids(usuarios_service.get_usuarios_por_ids, "usuario_id")
     except Exception as e:
         return jsonify({"error": f"Error al leer usuarios: {str(e)}"}), 500
 
 
+@usuarios_bp.route("/usuarios", methods=["GET"])
+@valet_key_required(scope="read:usuarios", method="GET")
+def listar_usuarios():
+    """Lista de usuarios, o varios usuarios por id con ?ids=1,2,3"""
+    if "ids" in request.args:
+        return get_usuarios_por_ids()
+    return get_usuarios()
+
+
 @usuarios_bp.route("/usuarios", methods=["POST"])
 @valet_key_required(scope="write:usuarios", method="POST")
 def add_usuario():
@@ -45,15 +61,7 @@ def add_usuario():
         if not data or not data.get("nombre"):
             return jsonify({"error": "El campo 'nombre' es obligatorio"}), 400
 
-        with open(DATA_FILE) as f:
-            usuarios = json.load(f)
-
-        nuevo_id = (usuarios[-1]["id"] + 1) if usuarios else 1
-        data["id"] = nuevo_id
-        usuarios.append(data)
-
-        with open(DATA_FILE, "w") as f:
-            json.dump(usuarios, f, indent=4)
+        usuarios_service.add_usuario(data)
 
         return jsonify({
             "mensaje": "Usuario creado exitosamente",
@@ -64,6 +72,34 @@ def add_usuario():
         return jsonify({"error": f"No se pudo crear el usuario: {str(e)}"}), 500
 
 
+@usuarios_bp.route("/usuarios/bulk", methods=["POST"])
+@valet_key_required(scope="write:usuarios", method="POST")
+def add_usuarios_bulk():
+    """Alta masiva de usuarios: persiste todos los válidos en una sola escritura"""
+    try:
+        items = leer_items_bulk()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        resultados = [None] * len(items)
+        validos = []
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get("nombre"):
+                resultados[i] = item_error(i, "El campo 'nombre' es obligatorio")
+            else:
+                validos.append((i, item))
+
+        if validos:
+            usuarios_service.add_usuarios([item for _, item in validos])
+        for i, item in validos:
+            resultados[i] = item_ok(i, item)
+
+        return responder_bulk(resultados, "Alta masiva de usuarios procesada")
+    except Exception as e:
+        return jsonify({"error": f"No se pudieron crear los usuarios: {str(e)}"}), 500
+
+
 @usuarios_bp.route("/tokens", methods=["POST"])
 def generate_token():
     """Genera un nuevo token/API key para acceso a los servicios"""
@@ -71,20 +107,12 @@ def generate_token():
         # Generar token seguro
         token = secrets.token_urlsafe(32)
         
-        # Guardar token en archivo
-        with open(TOKENS_FILE) as f:
-            tokens_data = json.load(f)
-        
-        tokens_data.append({
-            "token": token,
-            "description": "API Key generada para acceso a servicios"
-        })
+        # Guardar token en el almacén (indexado por digest, con expiración)
+        token_store.registrar(token, "API Key generada para acceso a servicios")
         
-        with open(TOKENS_FILE, "w") as f:
-            json.dump(tokens_data, f, indent=4)
-        
-        # Guardar en Redis con expiración de 24 horas
-        redis_client.setex(f"token:{token}", 86400, "valid")
+        # Guardar en Redis con la misma expiración (24 horas por defecto)
+        redis_client.setex(f"token:{token}", TOKEN_TTL, "valid")
+        invalidar_token(token)
         
         return jsonify({
             "mensaje": "Token generado exitosamente",
@@ -112,13 +140,13 @@ def generate_valet_key():
         },
         "expires_in_hours": 1  # Expiración en horas (default: 1)
     }
+    
+    Con VALET_KEY_MODE=firmado el valet key se emite firmado con los permisos
+    embebidos y no se guarda en Redis.
     """
     try:
         data = request.json or {}
         
-        # Generar token seguro para el valet key
-        valet_key_token = secrets.token_urlsafe(32)
-        
         # Obtener configuración del request
         scopes = data.get("scopes", [])
         allowed_methods = data.get("allowed_methods", ["*"])
@@ -132,23 +160,29 @@ def generate_valet_key():
         # Crear metadata del valet key
         expires_at = datetime.now() + timedelta(hours=expires_in_hours)
         
-        valet_key_metadata = {
-            "token": valet_key_token,
-            "scopes": scopes,
-            "allowed_methods": allowed_methods,
-            "resource_constraints": resource_constraints,
-            "expires_at": expires_at.isoformat(),
-            "created_at": datetime.now().isoformat(),
-            "type": "valet_key"
-        }
-        
-        # Guardar en Redis con expiración automática
-        ttl_seconds = int(expires_in_hours * 3600)
-        redis_client.setex(
-            f"valet_key:{valet_key_token}",
-            ttl_seconds,
-            json.dumps(valet_key_metadata)
-        )
+        if valet_keys.VALET_KEY_MODE == "firmado":
+            valet_key_token = valet_keys.emitir(scopes, allowed_methods, resource_constraints, expires_at)
+        else:
+            # Generar token seguro para el valet key
+            valet_key_token = secrets.token_urlsafe(32)
+            valet_key_metadata = {
+                "token": valet_key_token,
+                "scopes": scopes,
+                "allowed_methods": allowed_methods,
+                "resource_constraints": resource_constraints,
+                "expires_at": expires_at.isoformat(),
+                "created_at": datetime.now().isoformat(),
+                "type": "valet_key"
+            }
+            
+            # Guardar en Redis con expiración automática
+            ttl_seconds = int(expires_in_hours * 3600)
+            redis_client.setex(
+                f"valet_key:{valet_key_token}",
+                ttl_seconds,
+                json.dumps(valet_key_metadata)
+            )
+        invalidar_token(valet_key_token)
         
         return jsonify({
             "mensaje": "Valet Key generado exitosamente",
@@ -164,3 +198,49 @@ def generate_valet_key():
         
     except Exception as e:
         return jsonify({"error": f"No se pudo generar Valet Key: {str(e)}"}), 500
+
+
+def _revocacion_denegada():
+    """Los valet keys no pueden revocar credenciales: solo la API Key del gateway o un token regular"""
+    if get_auth_context().tipo == "valet_key":
+        return jsonify({"error": "Un Valet Key no puede revocar tokens ni Valet Keys"}), 403
+    return None
+
+
+@usuarios_bp.route("/tokens/<token>", methods=["DELETE"])
+@gatekeeper_required
+def revocar_token(token):
+    """Revoca un token: lo elimina de Redis y del almacén de tokens, e invalida las caches"""
+    denegada = _revocacion_denegada()
+    if denegada:
+        return denegada
+    if token == INTERNAL_SERVICE_TOKEN:
+        return jsonify({"error": "El token interno no puede revocarse"}), 400
+
+    en_archivo = token_store.revocar(token)
+    en_redis = redis_client.delete(f"token:{token}")
+    invalidar_token(token)
+
+    if not en_archivo and not en_redis:
+        return jsonify({"error": "Token no encontrado"}), 404
+    return jsonify({"mensaje": "Token revocado"})
+
+
+@usuarios_bp.route("/valet-keys/<valet_key>", methods=["DELETE"])
+@gatekeeper_required
+def revocar_valet_key(valet_key):
+    """Revoca un valet key antes de su expiración e invalida las caches"""
+    denegada = _revocacion_denegada()
+    if denegada:
+        return denegada
+    if valet_keys.es_firmado(valet_key):
+        permisos = valet_keys.verificar(valet_key)
+        eliminado = permisos is not None
+        if eliminado:
+            valet_keys.revocar(permisos)
+    else:
+        eliminado = redis_client.delete(f"valet_key:{valet_key}")
+    invalidar_token(valet_key)
+    if not eliminado:
+        return jsonify({"error": "Valet Key no encontrado"}), 404
+    return jsonify({"mensaje": "Valet Key revocado"})
@@ -0,0 +1,36 @@
+"""
+Configuración de gunicorn para el modo producción del monolito.
+Levanta varios workers (procesos) con hilos cada uno; las escrituras a los
+archivos compartidos usan locks entre procesos (services/archivos.py).
+
+Uso:
+    gunicorn -c gunicorn.conf.py app:app
+
+Con varios workers conviene CIRCUIT_BREAKER_BACKEND=redis, para que los
+circuitos se compartan entre procesos.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+
+# Sin preload: cada worker importa la aplicación después del fork. Al importarse
+# la aplicación inicia hilos en segundo plano (precalentamiento, compactadores,
+# suscriptor de invalidaciones); si lo hiciera el maestro, un worker podría
+# heredar por fork un lock tomado por uno de esos hilos, que nadie liberaría.
+# Por el mismo motivo worker.py crea sus procesos con "spawn".
+preload_app = False
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Reinicia cada worker luego de N requests (0 = nunca), con jitter para no reiniciarlos juntos
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
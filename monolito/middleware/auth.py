@@ -2,16 +2,18 @@
 Módulo de autenticación compartido para el monolito.
 Incluye validación de API Key del gateway, tokens, y Valet Keys.
 """
-from flask import request, jsonify
+from flask import request, jsonify, g
 import json
 import os
 import redis
 import secrets
 from functools import wraps
 from datetime import datetime, timedelta
-
-# Conexión a Redis compartida
-redis_client = redis.Redis(host="redis", port=6379, decode_responses=True)
+from services.redis_client import redis_client
+from services.cache_local import LRUCache
+from services import invalidaciones, valet_keys
+from services.valet_keys import PermisosValetKey
+from services.token_store import TokenStore, TOKEN_TTL
 
 # Archivos compartidos
 TOKENS_FILE = "tokens.json"
@@ -20,25 +22,20 @@ INTERNAL_SERVICE_TOKEN = "internal-service-token-2024"
 # API Key del gateway (migrado de gateway-service)
 API_KEY = os.getenv("API_KEY", "supersecreta123")
 
-# Inicializar archivo de tokens si no existe
-if not os.path.exists(TOKENS_FILE):
-    with open(TOKENS_FILE, "w") as f:
-        json.dump([], f)
-
-# Registrar token de servicio interno automáticamente
-try:
-    with open(TOKENS_FILE, "r") as f:
-        tokens_data = json.load(f)
-except:
-    tokens_data = []
-
-if not any(t.get("token") == INTERNAL_SERVICE_TOKEN for t in tokens_data):
-    tokens_data.append({
-        "token": INTERNAL_SERVICE_TOKEN,
-        "description": "Token interno para comunicación entre servicios"
-    })
-    with open(TOKENS_FILE, "w") as f:
-        json.dump(tokens_data, f, indent=4)
+# Cache local de decisiones de autenticación: token -> (tipo, metadata, expires_at)
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "5"))
+AUTH_CANAL = "auth"
+
+auth_cache = LRUCache(AUTH_CACHE_MAX)
+
+# Almacén de tokens indexado por digest (migra el formato anterior de tokens.json)
+token_store = TokenStore(TOKENS_FILE)
+
+# Registrar token de servicio interno automáticamente (sin expiración)
+if token_store.vigencia(INTERNAL_SERVICE_TOKEN) != float("inf"):
+    token_store.registrar(INTERNAL_SERVICE_TOKEN, "Token interno para comunicación entre servicios", ttl=None)
     # Registrar en Redis también
     try:
         redis_client.setex(f"token:{INTERNAL_SERVICE_TOKEN}", 86400 * 365, "valid")  # 1 año
@@ -68,37 +65,42 @@ def get_valet_key_metadata(token):
     return None
 
 
-def validate_valet_key_permissions(token, required_scope=None, required_resource=None, required_method=None):
+def validate_valet_key_permissions(token, required_scope=None, required_resource=None, required_method=None, contexto=None):
     """
     Valida que el valet key tenga los permisos necesarios
     - required_scope: ej. "read:proyectos", "write:usuarios"
     - required_resource: ej. {"proyecto_id": 1}, {"usuario_id": 2}
     - required_method: "GET", "POST", etc.
+    - contexto: AuthContext ya resuelto para el request (evita volver a consultar Redis)
     """
-    metadata = get_valet_key_metadata(token)
-    if not metadata:
-        return False, "Valet key no encontrado o expirado"
+    if contexto is not None and contexto.tipo == "valet_key":
+        permisos = contexto.permisos
+    elif valet_keys.es_firmado(token):
+        # Valet key firmado: se valida localmente, sin consultar Redis
+        permisos = valet_keys.verificar(token)
+        if not permisos or valet_keys.esta_revocado(permisos):
+            return False, "Valet key inválido o revocado"
+    else:
+        metadata = get_valet_key_metadata(token)
+        if not metadata:
+            return False, "Valet key no encontrado o expirado"
+        permisos = PermisosValetKey(metadata)
     
     # Validar expiración
-    expires_at = datetime.fromisoformat(metadata.get("expires_at"))
-    if datetime.now() > expires_at:
+    if datetime.now() > permisos.expires_at:
         return False, "Valet key expirado"
     
     # Validar scope si se requiere
-    if required_scope:
-        scopes = metadata.get("scopes", [])
-        if required_scope not in scopes and "*" not in scopes:
-            return False, f"Valet key no tiene el permiso requerido: {required_scope}"
+    if required_scope and not permisos.permite_scope(required_scope):
+        return False, f"Valet key no tiene el permiso requerido: {required_scope}"
     
     # Validar método HTTP si se requiere
-    if required_method:
-        allowed_methods = metadata.get("allowed_methods", [])
-        if required_method not in allowed_methods and "*" not in allowed_methods:
-            return False, f"Valet key no permite el método {required_method}"
+    if required_method and not permisos.permite_metodo(required_method):
+        return False, f"Valet key no permite el método {required_method}"
     
     # Validar recursos específicos si se requiere
     if required_resource:
-        resource_constraints = metadata.get("resource_constraints", {})
+        resource_constraints = permisos.restricciones
         for key, value in required_resource.items():
             if key in resource_constraints:
                 allowed_values = resource_constraints[key]
@@ -121,49 +123,166 @@ def validate_api_key():
     return False
 
 
+class AuthContext:
+    """Resultado de autenticar el request; se resuelve una sola vez por request"""
+
+    def __init__(self, tipo, token=None, permisos=None, error=None):
+        self.tipo = tipo            # "api_key", "valet_key", "token" o None si falló
+        self.token = token
+        self.permisos = permisos    # PermisosValetKey, si corresponde
+        self.metadata = permisos.metadata if permisos else None
+        self.expires_at = permisos.expires_at if permisos else None
+        self.error = error          # (mensaje, status) si la autenticación falló
+
+
+def _aplicar_invalidacion(token):
+    """Callback de pub/sub: None o '*' vacían la cache, un token elimina su entrada"""
+    if token is None or token == "*":
+        auth_cache.clear()
+    else:
+        auth_cache.delete(token)
+
+
+invalidaciones.suscribir(AUTH_CANAL, _aplicar_invalidacion)
+
+
+def invalidar_token(token):
+    """Descarta la decisión cacheada del token en todos los procesos"""
+    auth_cache.delete(token)
+    invalidaciones.publicar(AUTH_CANAL, token)
+
+
+def _ttl_restante(pttl):
+    """Convierte un PTTL de Redis a segundos (sin expiración = infinito)"""
+    return float("inf") if pttl == -1 else pttl / 1000
+
+
+def _consultar_token(token):
+    """
+    Decide si el token es un valet key, un token regular o inválido.
+    Las claves valet_key:<token> y token:<token> se consultan en un solo
+    round trip mediante un pipeline. Retorna ((tipo, permisos), ttl),
+    donde ttl es cuánto puede cachearse la decisión (acotado por el TTL en Redis).
+    """
+    redis_disponible = True
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(f"valet_key:{token}")
+        pipe.pttl(f"valet_key:{token}")
+        pipe.pttl(f"token:{token}")
+        metadata_json, pttl_valet, pttl_token = pipe.execute()
+    except redis.RedisError:
+        metadata_json, pttl_valet, pttl_token = None, -2, -2
+        redis_disponible = False
+
+    # Es un valet key
+    if metadata_json:
+        permisos = PermisosValetKey(json.loads(metadata_json))
+        vigencia = (permisos.expires_at - datetime.now()).total_seconds()
+        return ("valet_key", permisos), min(AUTH_CACHE_TTL, _ttl_restante(pttl_valet), vigencia)
+
+    # Es un token regular registrado en Redis
+    if pttl_token != -2:
+        return ("token", None), min(AUTH_CACHE_TTL, _ttl_restante(pttl_token))
+
+    # Si no está en Redis, buscar en el almacén de tokens
+    vigencia = token_store.vigencia(token)
+    if vigencia is not None:
+        vigencia = min(3600, vigencia)
+        try:
+            redis_client.setex(f"token:{token}", max(1, int(vigencia)), "valid")
+        except redis.RedisError:
+            pass
+        return ("token", None), min(AUTH_CACHE_TTL, vigencia)
+
+    # Las decisiones negativas no se cachean si Redis no respondió
+    return (None, None), AUTH_CACHE_NEGATIVE_TTL if redis_disponible else 0
+
+
+def _verificar_firmado(token):
+    """Valida un valet key firmado sin consultar Redis. Retorna ((tipo, permisos), ttl)"""
+    permisos = valet_keys.verificar(token)
+    if permisos is None:
+        return (None, None), AUTH_CACHE_NEGATIVE_TTL
+    vigencia = (permisos.expires_at - datetime.now()).total_seconds()
+    return ("valet_key", permisos), min(AUTH_CACHE_TTL, vigencia)
+
+
+def _resolver_auth():
+    """
+    Autentica el request. La decisión sobre cada token se cachea en el
+    proceso (positiva o negativa) y se invalida por pub/sub al emitir o
+    revocar tokens y valet keys.
+    """
+    # Primero verificar API Key del gateway (compatibilidad con gateway-service)
+    if validate_api_key():
+        return AuthContext("api_key")
+
+    token = get_token_from_request()
+    if not token:
+        return AuthContext(None, error=("Token de acceso requerido. Use header 'Authorization: Bearer <token>' o 'X-API-Key: <token>'", 401))
+
+    decision = auth_cache.get(token)
+    if decision is None:
+        if valet_keys.es_firmado(token):
+            decision, ttl = _verificar_firmado(token)
+        else:
+            decision, ttl = _consultar_token(token)
+        auth_cache.set(token, decision, ttl)
+    tipo, permisos = decision
+
+    # Es un valet key: validar expiración y, si es firmado, revocación
+    if tipo == "valet_key":
+        contexto = AuthContext("valet_key", token, permisos)
+        if datetime.now() > permisos.expires_at:
+            contexto.error = ("Valet key expirado", 403)
+        elif permisos.jti and valet_keys.esta_revocado(permisos):
+            contexto.error = ("Valet key revocado", 403)
+        return contexto
+
+    if tipo is None:
+        return AuthContext(None, token, error=("Token inválido o expirado", 403))
+    return AuthContext("token", token)
+
+
+def get_auth_context():
+    """Obtiene el AuthContext del request actual, resolviéndolo la primera vez"""
+    contexto = g.get("auth")
+    if contexto is None:
+        contexto = _resolver_auth()
+        g.auth = contexto
+    return contexto
+
+
 def gatekeeper_required(f):
     """Decorador que valida tokens/API keys antes de permitir acceso a endpoints"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Primero verificar API Key del gateway (compatibilidad con gateway-service)
-        if validate_api_key():
-            # API Key válida del gateway, permitir acceso
-            request.valet_key_metadata = None
-            return f(*args, **kwargs)
-        
-        # Si no es API Key del gateway, validar token/valet key
-        token = get_token_from_request()
-        
-        if not token:
-            return jsonify({"error": "Token de acceso requerido. Use header 'Authorization: Bearer <token>' o 'X-API-Key: <token>'"}), 401
-        
-        # Primero verificar si es un valet key
-        valet_key_metadata = get_valet_key_metadata(token)
-        if valet_key_metadata:
-            # Es un valet key, validar permisos básicos
-            expires_at = datetime.fromisoformat(valet_key_metadata.get("expires_at"))
-            if datetime.now() > expires_at:
-                return jsonify({"error": "Valet key expirado"}), 403
-            # Guardar metadata en request para uso en endpoints
-            request.valet_key_metadata = valet_key_metadata
-        else:
-            # Es un token regular, validar como antes
-            token_key = f"token:{token}"
-            if not redis_client.exists(token_key):
-                try:
-                    with open(TOKENS_FILE) as tokens_file:
-                        tokens_data = json.load(tokens_file)
-                    if token not in [t.get("token") for t in tokens_data]:
-                        return jsonify({"error": "Token inválido o expirado"}), 403
-                    redis_client.setex(token_key, 3600, "valid")
-                except Exception:
-                    return jsonify({"error": "Token inválido o expirado"}), 403
-            request.valet_key_metadata = None
+        contexto = get_auth_context()
+        if contexto.error:
+            mensaje, status = contexto.error
+            return jsonify({"error": mensaje}), status
         
+        # Guardar metadata en request para uso en endpoints
+        request.valet_key_metadata = contexto.metadata
         return f(*args, **kwargs)
     return decorated_function
 
 
+def recursos_permitidos(resource_key):
+    """
+    Valores de resource_key a los que está restringido el valet key del request,
+    o None si no hay restricción (API Key, token regular o valet key sin esa restricción)
+    """
+    contexto = get_auth_context()
+    if contexto.tipo != "valet_key":
+        return None
+    permitidos = contexto.permisos.restricciones.get(resource_key)
+    if permitidos is None:
+        return None
+    return set(permitidos) if isinstance(permitidos, list) else {permitidos}
+
+
 def valet_key_required(scope=None, resource_key=None, method=None):
     """
     Decorador que valida permisos específicos de Valet Key
@@ -175,15 +294,10 @@ def valet_key_required(scope=None, resource_key=None, method=None):
         @wraps(f)
         @gatekeeper_required
         def decorated_function(*args, **kwargs):
-            # Si pasó la validación de API Key del gateway, permitir acceso completo
-            if validate_api_key():
-                return f(*args, **kwargs)
-            
-            token = get_token_from_request()
-            valet_key_metadata = getattr(request, 'valet_key_metadata', None)
+            contexto = get_auth_context()
             
-            # Si es un token regular (no valet key), permitir acceso completo
-            if not valet_key_metadata:
+            # API Key del gateway o token regular (no valet key): acceso completo
+            if contexto.tipo != "valet_key":
                 return f(*args, **kwargs)
             
             # Para valet keys, validar permisos específicos
@@ -192,10 +306,11 @@ def valet_key_required(scope=None, resource_key=None, method=None):
                 required_resource = {resource_key: kwargs[resource_key]}
             
             is_valid, error_msg = validate_valet_key_permissions(
-                token, 
+                contexto.token, 
                 required_scope=scope,
                 required_resource=required_resource,
-                required_method=method or request.method
+                required_method=method or request.method,
+                contexto=contexto
             )
             
             if not is_valid:
@@ -204,4 +319,3 @@ def valet_key_required(scope=None, resource_key=None, method=None):
             return f(*args, **kwargs)
         return decorated_function
     return decorator
-
@@ -0,0 +1,23 @@
+"""
+Migración única de los archivos JSON al backend SQLite.
+Importa usuarios, proyectos y tareas (snapshot + journal si existe)
+a la base indicada por SQLITE_PATH.
+
+Uso:
+    python migrar_sqlite.py
+"""
+from services.journal import JournalRepository
+from services.sqlite_backend import SqliteRepository, SQLITE_PATH
+
+DATA_FILES = ["usuarios.json", "proyectos.json", "tareas.json"]
+
+
+def migrar():
+    for data_file in DATA_FILES:
+        items = JournalRepository(data_file).all()
+        SqliteRepository(data_file).importar(items)
+        print(f"✅ {data_file}: {len(items)} registros importados en {SQLITE_PATH}")
+
+
+if __name__ == "__main__":
+    migrar()
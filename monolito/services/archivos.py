@@ -0,0 +1,65 @@
+"""
+Escritura segura de archivos compartidos entre varios procesos (workers).
+- bloqueo(path): lock advisory exclusivo (fcntl.flock) sobre <path>.lock,
+  que serializa las escrituras de todos los procesos sobre el mismo archivo.
+- escribir_atomico(path, contenido): escribe en un temporal único del mismo
+  directorio, hace fsync y lo renombra sobre el destino; los lectores ven el
+  archivo anterior o el nuevo completo, nunca uno a medio escribir.
+En plataformas sin fcntl (Windows) el lock solo protege dentro del proceso.
+"""
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_locks_locales = {}   # path -> Lock, usado cuando no hay fcntl
+_registro_lock = threading.Lock()
+
+
+def _lock_local(path):
+    with _registro_lock:
+        return _locks_locales.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextmanager
+def bloqueo(path):
+    """Lock exclusivo entre procesos sobre path (no reentrante)"""
+    if fcntl is None:
+        with _lock_local(path):
+            yield
+        return
+
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def escribir_atomico(path, contenido):
+    """Reemplaza el contenido de path de forma atómica (temporal + fsync + rename)"""
+    directorio = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directorio, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            # mkstemp crea el archivo con permisos 0600: se conservan los del original
+            try:
+                os.chmod(tmp, os.stat(path).st_mode & 0o777)
+            except FileNotFoundError:
+                os.chmod(tmp, 0o644)
+            f.write(contenido)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,298 @@
+"""
+Capa de cache-aside sobre Redis para las lecturas de usuarios, proyectos y tareas.
+- Claves versionadas por colección: cada escritura incrementa la versión
+  (cache:version:<coleccion>) y las entradas anteriores dejan de leerse
+  y expiran solas por TTL. La misma versión se usa para los ETags de las
+  listas; se inicializa con el timestamp actual en ms para que no vuelva a
+  empezar de cero si Redis pierde la clave.
+- Single-flight: ante un miss solo el request que obtiene el lock
+  (SET NX) reconstruye la entrada; el resto espera brevemente a que
+  aparezca en lugar de leer el repositorio al mismo tiempo.
+- Refresco anticipado probabilístico (XFetch): cerca de la expiración un
+  request puede reconstruir la entrada antes de que venza, mientras los
+  demás siguen recibiendo el valor cacheado.
+- Lecturas múltiples por id (obtener_varios): la versión y todas las
+  entradas se leen con un solo MGET, los faltantes se cargan en una sola
+  pasada y se guardan con un único pipeline de SETEX.
+- Refresh-ahead (refrescar): recarga de antemano las entradas por id que
+  están por vencer; lo usa services/precalentamiento.py para las claves calientes.
+- Contadores de hits, misses y reconstrucciones por colección y proceso.
+- Cada invalidación se publica por pub/sub (canal "cache") para que los
+  procesos descarten su cache local de respuestas (L1).
+Si Redis no está disponible la lectura va directo al repositorio.
+"""
+import json
+import math
+import os
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+import redis
+from services.redis_client import redis_client
+from services import invalidaciones
+
+CACHE_TTL = int(os.getenv("CACHE_TTL", "30"))   # segundos que los datos duran en cache
+CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", "5000"))
+CACHE_LOCK_WAIT_MS = int(os.getenv("CACHE_LOCK_WAIT_MS", "500"))
+CACHE_XFETCH_BETA = float(os.getenv("CACHE_XFETCH_BETA", "1.0"))
+
+VERSION_PREFIX = "cache:version:"
+CANAL_CACHE = "cache"
+LOCK_PREFIX = "cache:lock:"
+ESPERA_INTERVALO = 0.025
+
+# Lee la versión de la colección y la entrada de esa versión en un solo round trip
+# KEYS[1]=clave de versión; ARGV[1], ARGV[2]=prefijo y sufijo de la clave de la entrada
+_leer_versionado = redis_client.register_script("""
+local version = redis.call('GET', KEYS[1]) or '0'
+return {version, redis.call('GET', ARGV[1] .. version .. ARGV[2])}
+""")
+
+# Versión de la colección y MGET de las entradas de esa versión en un solo round trip
+# KEYS[1]=clave de versión; ARGV[1]=prefijo de las claves, ARGV[2..]=sufijos
+_leer_versionado_varios = redis_client.register_script("""
+local version = redis.call('GET', KEYS[1]) or '0'
+local claves = {}
+for i = 2, #ARGV do
+    claves[#claves + 1] = ARGV[1] .. version .. ARGV[i]
+end
+return {version, redis.call('MGET', unpack(claves))}
+""")
+
+# Libera el lock solo si sigue perteneciendo a quien lo tomó
+_liberar_lock = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+_contadores = {}   # coleccion -> Counter
+_contadores_lock = threading.Lock()
+
+# Generación local de cada colección: cambia con cada invalidación (propia o
+# recibida por pub/sub). La cache L1 la usa para descartar respuestas viejas.
+_generaciones = Counter()
+_epoca = 0   # cambia al (re)conectar la suscripción, invalidando todas las colecciones
+
+
+def _contar(coleccion, evento):
+    with _contadores_lock:
+        _contadores.setdefault(coleccion, Counter())[evento] += 1
+
+
+def _vence_pronto(entrada):
+    """XFetch: decide si refrescar antes de la expiración según el costo de reconstrucción"""
+    azar = 1.0 - random.random()   # (0, 1]
+    return time.time() - entrada["d"] * CACHE_XFETCH_BETA * math.log(azar) >= entrada["e"]
+
+
+def _reconstruir(coleccion, clave_entrada, cargar, ttl):
+    """Carga el valor del repositorio y lo guarda junto al costo de la reconstrucción"""
+    inicio = time.time()
+    valor = cargar()
+    if valor is not None:
+        fin = time.time()
+        entrada = {"v": valor, "d": fin - inicio, "e": fin + ttl}
+        try:
+            redis_client.set(clave_entrada, json.dumps(entrada), ex=ttl)
+        except redis.RedisError as e:
+            print(f"No se pudo guardar en cache {clave_entrada}: {e}")
+    _contar(coleccion, "rebuilds")
+    return valor
+
+
+def _esperar_entrada(clave_entrada):
+    """Espera a que otro request termine de reconstruir la entrada"""
+    limite = time.monotonic() + CACHE_LOCK_WAIT_MS / 1000
+    while time.monotonic() < limite:
+        time.sleep(ESPERA_INTERVALO)
+        cacheado = redis_client.get(clave_entrada)
+        if cacheado is not None:
+            return json.loads(cacheado)
+    return None
+
+
+def obtener(coleccion, clave, cargar, ttl=CACHE_TTL):
+    """
+    Cache-aside de una lectura de la colección.
+    - clave: identifica la consulta dentro de la colección (ej. "id:3", "pagina:None:50")
+    - cargar(): lee del repositorio; los resultados None no se cachean
+    """
+    try:
+        prefijo, sufijo = f"cache:{coleccion}:v", f":{clave}"
+        version, cacheado = _leer_versionado(keys=[f"{VERSION_PREFIX}{coleccion}"], args=[prefijo, sufijo])
+        clave_entrada = f"{prefijo}{version}{sufijo}"
+
+        entrada = json.loads(cacheado) if cacheado is not None else None
+        if entrada is not None and not _vence_pronto(entrada):
+            _contar(coleccion, "hits")
+            return entrada["v"]
+
+        # Miss o refresco anticipado: solo reconstruye quien obtiene el lock
+        clave_lock = f"{LOCK_PREFIX}{clave_entrada}"
+        duenio = secrets.token_hex(8)
+        if redis_client.set(clave_lock, duenio, nx=True, px=CACHE_LOCK_TTL_MS):
+            _contar(coleccion, "misses" if entrada is None else "refrescos_anticipados")
+            try:
+                return _reconstruir(coleccion, clave_entrada, cargar, ttl)
+            finally:
+                _liberar_lock(keys=[clave_lock], args=[duenio])
+
+        if entrada is not None:
+            # Otro request ya está refrescando: se sirve el valor vigente
+            _contar(coleccion, "hits")
+            return entrada["v"]
+
+        _contar(coleccion, "misses")
+        entrada = _esperar_entrada(clave_entrada)
+        if entrada is not None:
+            _contar(coleccion, "esperas")
+            return entrada["v"]
+        return _reconstruir(coleccion, clave_entrada, cargar, ttl)
+    except redis.RedisError as e:
+        print(f"Cache no disponible ({coleccion}): {e}")
+        _contar(coleccion, "errores")
+        return cargar()
+
+
+def _cargar_y_guardar(coleccion, prefijo_version, ids, cargar, ttl):
+    """Carga los ids en una sola pasada y los guarda con un único pipeline de SETEX"""
+    inicio = time.time()
+    cargados = cargar(ids)
+    fin = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    for item_id, item in cargados.items():
+        entrada = {"v": item, "d": fin - inicio, "e": fin + ttl}
+        pipe.setex(f"{prefijo_version}:id:{item_id}", ttl, json.dumps(entrada))
+    try:
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"No se pudieron guardar en cache {len(cargados)} entradas de {coleccion}: {e}")
+    return cargados
+
+
+def obtener_varios(coleccion, ids, cargar, ttl=CACHE_TTL):
+    """
+    Cache-aside de varias lecturas por id, con las mismas claves que "id:<id>".
+    - cargar(ids_faltantes): {id: registro} leído del repositorio en una sola pasada
+    Retorna {id: registro} para los ids que existen
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    try:
+        prefijo = f"cache:{coleccion}:v"
+        version, cacheados = _leer_versionado_varios(
+            keys=[f"{VERSION_PREFIX}{coleccion}"], args=[prefijo] + [f":id:{item_id}" for item_id in ids])
+
+        encontrados = {}
+        faltantes = []
+        for item_id, cacheado in zip(ids, cacheados):
+            if cacheado is None:
+                faltantes.append(item_id)
+            else:
+                encontrados[item_id] = json.loads(cacheado)["v"]
+        with _contadores_lock:
+            contador = _contadores.setdefault(coleccion, Counter())
+            contador["hits"] += len(encontrados)
+            contador["misses"] += len(faltantes)
+        if not faltantes:
+            return encontrados
+
+        cargados = _cargar_y_guardar(coleccion, f"{prefijo}{version}", faltantes, cargar, ttl)
+        _contar(coleccion, "rebuilds")
+        encontrados.update(cargados)
+        return encontrados
+    except redis.RedisError as e:
+        print(f"Cache no disponible ({coleccion}): {e}")
+        _contar(coleccion, "errores")
+        return cargar(ids)
+
+
+def refrescar(coleccion, ids, cargar, margen, ttl=CACHE_TTL):
+    """
+    Refresh-ahead de entradas por id: recarga las que no están en cache o
+    vencen en menos de margen segundos (con margen 0, solo las que no están).
+    Retorna cuántas se recargaron.
+    Lanza redis.RedisError si Redis no está disponible.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return 0
+    version = redis_client.get(f"{VERSION_PREFIX}{coleccion}") or "0"
+    prefijo_version = f"cache:{coleccion}:v{version}"
+    pipe = redis_client.pipeline(transaction=False)
+    for item_id in ids:
+        pipe.pttl(f"{prefijo_version}:id:{item_id}")
+    # PTTL: -2 si la clave no existe; -1 si no expira (no se refresca)
+    vencen = [item_id for item_id, pttl in zip(ids, pipe.execute()) if pttl != -1 and pttl < margen * 1000]
+    if not vencen:
+        return 0
+    cargados = _cargar_y_guardar(coleccion, prefijo_version, vencen, cargar, ttl)
+    with _contadores_lock:
+        _contadores.setdefault(coleccion, Counter())["refrescos_programados"] += len(cargados)
+    return len(cargados)
+
+
+def generacion(coleccion):
+    """Generación actual de la colección en este proceso"""
+    return (_epoca, _generaciones[coleccion])
+
+
+def _aplicar_invalidacion(coleccion):
+    """Callback de pub/sub: None invalida todas las colecciones"""
+    global _epoca
+    if coleccion is None:
+        _epoca += 1
+    else:
+        _generaciones[coleccion] += 1
+
+
+invalidaciones.suscribir(CANAL_CACHE, _aplicar_invalidacion)
+
+
+def _semilla_version():
+    return int(time.time() * 1000)
+
+
+def version(coleccion):
+    """Versión actual de la colección (monótona), o None si Redis no está disponible"""
+    clave = f"{VERSION_PREFIX}{coleccion}"
+    try:
+        actual = redis_client.get(clave)
+        if actual is None:
+            redis_client.set(clave, _semilla_version(), nx=True)
+            actual = redis_client.get(clave)
+        return int(actual)
+    except redis.RedisError as e:
+        print(f"No se pudo leer la versión de {coleccion}: {e}")
+        return None
+
+
+def invalidar(coleccion):
+    """
+    Invalida todas las entradas de la colección incrementando su versión,
+    y avisa a los procesos para que descarten sus respuestas cacheadas en L1
+    """
+    _aplicar_invalidacion(coleccion)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(f"{VERSION_PREFIX}{coleccion}", _semilla_version(), nx=True)
+        pipe.incr(f"{VERSION_PREFIX}{coleccion}")
+        pipe.publish(f"{invalidaciones.CANAL_PREFIJO}{CANAL_CACHE}", coleccion)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"No se pudo invalidar la cache de {coleccion}: {e}")
+
+
+def estadisticas():
+    """Contadores de la cache por colección (de este proceso)"""
+    with _contadores_lock:
+        resultado = {}
+        for coleccion, contador in _contadores.items():
+            lecturas = contador["hits"] + contador["misses"]
+            resultado[coleccion] = dict(contador, hit_ratio=round(contador["hits"] / lecturas, 4) if lecturas else 0.0)
+        return resultado
@@ -0,0 +1,84 @@
+"""
+Cache en memoria del proceso, acotada con desalojo LRU y TTL por entrada.
+Puede acotarse además por tamaño total (bytes) de los valores guardados.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Cache LRU acotada en cantidad de entradas (y opcionalmente en bytes), con TTL por entrada"""
+
+    def __init__(self, max_entries, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()   # clave -> (valor, vencimiento monotónico, tamaño)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clave, default=None, vigente=None):
+        """
+        Obtiene un valor vigente, o default si no está o ya venció.
+        vigente: predicado opcional sobre el valor; si retorna False la entrada
+        se descarta y cuenta como miss (p. ej. de una generación anterior)
+        """
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return default
+            valor, vencimiento, tamano = entrada
+            if vencimiento <= time.monotonic() or (vigente is not None and not vigente(valor)):
+                del self._datos[clave]
+                self._bytes -= tamano
+                self.misses += 1
+                return default
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def set(self, clave, valor, ttl, tamano=0):
+        """
+        Guarda un valor por ttl segundos, desalojando los menos usados si hace falta.
+        tamano: bytes que ocupa el valor, para el límite max_bytes
+        """
+        if ttl <= 0 or (self.max_bytes is not None and tamano > self.max_bytes):
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._datos[clave] = (valor, time.monotonic() + ttl, tamano)
+            self._bytes += tamano
+            while len(self._datos) > self.max_entries or \
+                    (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._bytes -= self._datos.popitem(last=False)[1][2]
+
+    def delete(self, clave):
+        """Elimina una entrada si existe"""
+        with self._lock:
+            entrada = self._datos.pop(clave, None)
+            if entrada is not None:
+                self._bytes -= entrada[2]
+
+    def clear(self):
+        """Vacía la cache"""
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Métricas de uso de la cache"""
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,227 @@
+"""
+Circuit breakers con nombre, uno por dependencia ("usuarios", "proyectos", ...).
+El estado vive en memoria del proceso y las transiciones son atómicas
+(cerrado -> abierto -> semiabierto -> cerrado/abierto). En semiabierto solo
+se deja pasar una cantidad limitada de llamadas de prueba.
+
+Con CIRCUIT_BREAKER_BACKEND=redis el estado se comparte entre workers en un
+hash de Redis y cada transición se ejecuta en un script Lua; si Redis no
+responde se usa el estado local.
+
+Uso:
+    breaker = circuit_breaker.obtener("usuarios")
+    resultado = breaker.llamar(funcion, *args)     # o bien
+    with breaker:
+        ...
+    @circuit_breaker.protegido("usuarios")
+    def funcion(...): ...
+"""
+import os
+import threading
+import time
+from functools import wraps
+import redis
+from services.redis_client import redis_client
+
+CIRCUIT_BREAKER_BACKEND = os.getenv("CIRCUIT_BREAKER_BACKEND", "memoria")   # "memoria" o "redis"
+FAIL_THRESHOLD = int(os.getenv("CIRCUIT_FAIL_THRESHOLD", "3"))
+RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "10"))
+HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbierto(Exception):
+    """La llamada se rechazó sin ejecutarse porque el circuito está abierto"""
+
+    def __init__(self, nombre):
+        super().__init__(f"Circuito abierto: servicio de {nombre} no disponible temporalmente")
+        self.nombre = nombre
+
+
+class CircuitBreaker:
+    """Circuit breaker con estado en memoria del proceso"""
+
+    def __init__(self, nombre, umbral_fallos=FAIL_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 sondas_semiabierto=HALF_OPEN_PROBES):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.reset_timeout = reset_timeout
+        self.sondas_semiabierto = sondas_semiabierto
+        self._lock = threading.Lock()
+        self._estado = CERRADO
+        self._fallos = 0
+        self._desde = 0.0     # momento de la última apertura o paso a semiabierto
+        self._sondas = 0
+
+    def _permitir(self):
+        """Decide si la llamada puede ejecutarse y reserva una sonda en semiabierto"""
+        ahora = time.time()
+        with self._lock:
+            if self._estado == ABIERTO:
+                if ahora - self._desde < self.reset_timeout:
+                    return False
+                self._estado, self._desde, self._sondas = SEMIABIERTO, ahora, 0
+            elif self._estado == SEMIABIERTO and ahora - self._desde >= self.reset_timeout:
+                # Sondas que nunca informaron su resultado: se liberan
+                self._desde, self._sondas = ahora, 0
+            if self._estado == SEMIABIERTO:
+                if self._sondas >= self.sondas_semiabierto:
+                    return False
+                self._sondas += 1
+            return True
+
+    def _registrar_exito(self):
+        with self._lock:
+            self._estado, self._fallos, self._sondas = CERRADO, 0, 0
+
+    def _registrar_fallo(self):
+        """Cuenta el fallo; retorna True si el circuito se abrió"""
+        with self._lock:
+            self._fallos += 1
+            if self._estado == SEMIABIERTO or self._fallos >= self.umbral_fallos:
+                abrio = self._estado != ABIERTO
+                self._estado, self._desde = ABIERTO, time.time()
+                return abrio
+            return False
+
+    def _fallo(self):
+        if self._registrar_fallo():
+            print(f"⚠️ Circuit breaker abierto: demasiadas fallas en {self.nombre}.")
+
+    def llamar(self, funcion, *args, **kwargs):
+        """Ejecuta funcion protegida por el circuito; lanza CircuitoAbierto si está abierto"""
+        if not self._permitir():
+            raise CircuitoAbierto(self.nombre)
+        try:
+            resultado = funcion(*args, **kwargs)
+        except Exception:
+            self._fallo()
+            raise
+        self._registrar_exito()
+        return resultado
+
+    def __enter__(self):
+        if not self._permitir():
+            raise CircuitoAbierto(self.nombre)
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        if tipo_exc is None:
+            self._registrar_exito()
+        elif issubclass(tipo_exc, Exception):
+            self._fallo()
+        return False
+
+    def estado(self):
+        with self._lock:
+            return {"estado": self._estado, "fallos": self._fallos}
+
+
+class RedisCircuitBreaker(CircuitBreaker):
+    """Circuit breaker cuyo estado se comparte entre workers mediante Redis"""
+
+    # KEYS[1]=hash del circuito; ARGV: ahora, reset_timeout, sondas_semiabierto
+    _LUA_PERMITIR = """
+    local estado = redis.call('HGET', KEYS[1], 'estado') or 'cerrado'
+    local ahora = tonumber(ARGV[1])
+    local desde = tonumber(redis.call('HGET', KEYS[1], 'desde') or '0')
+    if estado == 'abierto' then
+        if ahora - desde < tonumber(ARGV[2]) then return 0 end
+        redis.call('HSET', KEYS[1], 'estado', 'semiabierto', 'desde', ahora, 'sondas', 0)
+        estado = 'semiabierto'
+    elseif estado == 'semiabierto' and ahora - desde >= tonumber(ARGV[2]) then
+        redis.call('HSET', KEYS[1], 'desde', ahora, 'sondas', 0)
+    end
+    if estado == 'semiabierto' then
+        if tonumber(redis.call('HGET', KEYS[1], 'sondas') or '0') >= tonumber(ARGV[3]) then return 0 end
+        redis.call('HINCRBY', KEYS[1], 'sondas', 1)
+    end
+    return 1
+    """
+
+    # KEYS[1]=hash del circuito; ARGV: ahora, umbral_fallos. Retorna 1 si abrió el circuito
+    _LUA_FALLO = """
+    local estado = redis.call('HGET', KEYS[1], 'estado') or 'cerrado'
+    local fallos = redis.call('HINCRBY', KEYS[1], 'fallos', 1)
+    if estado == 'semiabierto' or fallos >= tonumber(ARGV[2]) then
+        redis.call('HSET', KEYS[1], 'estado', 'abierto', 'desde', ARGV[1])
+        if estado ~= 'abierto' then return 1 end
+    end
+    return 0
+    """
+
+    # Solo escribe si el circuito no estaba ya cerrado y sin fallos
+    _LUA_EXITO = """
+    if (redis.call('HGET', KEYS[1], 'estado') or 'cerrado') ~= 'cerrado'
+        or (redis.call('HGET', KEYS[1], 'fallos') or '0') ~= '0' then
+        redis.call('HSET', KEYS[1], 'estado', 'cerrado', 'fallos', 0, 'sondas', 0)
+    end
+    return 1
+    """
+
+    def __init__(self, nombre, **config):
+        super().__init__(nombre, **config)
+        self.clave = f"circuit:{nombre}"
+        self._permitir_script = redis_client.register_script(self._LUA_PERMITIR)
+        self._fallo_script = redis_client.register_script(self._LUA_FALLO)
+        self._exito_script = redis_client.register_script(self._LUA_EXITO)
+
+    def _permitir(self):
+        try:
+            return bool(self._permitir_script(
+                keys=[self.clave], args=[time.time(), self.reset_timeout, self.sondas_semiabierto]))
+        except redis.RedisError:
+            return super()._permitir()
+
+    def _registrar_exito(self):
+        try:
+            self._exito_script(keys=[self.clave])
+        except redis.RedisError:
+            super()._registrar_exito()
+
+    def _registrar_fallo(self):
+        try:
+            return bool(self._fallo_script(keys=[self.clave], args=[time.time(), self.umbral_fallos]))
+        except redis.RedisError:
+            return super()._registrar_fallo()
+
+    def estado(self):
+        try:
+            datos = redis_client.hgetall(self.clave)
+            return {"estado": datos.get("estado", CERRADO), "fallos": int(datos.get("fallos", 0))}
+        except redis.RedisError:
+            return super().estado()
+
+
+_breakers = {}
+_registro_lock = threading.Lock()
+
+
+def obtener(nombre, **config):
+    """Obtiene (o crea) el circuit breaker de una dependencia"""
+    breaker = _breakers.get(nombre)
+    if breaker is None:
+        with _registro_lock:
+            breaker = _breakers.get(nombre)
+            if breaker is None:
+                clase = RedisCircuitBreaker if CIRCUIT_BREAKER_BACKEND == "redis" else CircuitBreaker
+                breaker = _breakers[nombre] = clase(nombre, **config)
+    return breaker
+
+
+def protegido(nombre):
+    """Decorador que ejecuta la función protegida por el circuit breaker indicado"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return obtener(nombre).llamar(f, *args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def estados():
+    """Estado de todos los circuitos registrados"""
+    return {nombre: breaker.estado() for nombre, breaker in list(_breakers.items())}
@@ -0,0 +1,394 @@
+"""
+Servicio de cola de tareas (Queue-Based Load Leveling)
+Las tareas se encolan en Redis y las consumen los workers (worker.py)
+fuera del ciclo de request.
+
+La cola es confiable: cada worker mueve la tarea con BLMOVE a su propia
+lista de procesamiento y solo la quita de ahí (ack) después de persistirla.
+Un reaper devuelve a la cola las tareas cuyo visibility timeout venció
+(worker caído) y, luego de MAX_INTENTOS, las envía a la lista de fallidas.
+Las tareas se toman y persisten en lotes de hasta BATCH_SIZE.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from services import tareas_service
+from services.redis_client import redis_client
+
+# Conexión a Redis (cola de tareas)
+queue = redis_client
+QUEUE_KEY = "tareas_pendientes"
+FALLIDAS_KEY = "tareas_fallidas"
+PROCESANDO_PREFIX = "tareas:procesando:"
+VENCIMIENTOS_KEY = "tareas:vencimientos"
+PERSISTIDA_PREFIX = "tareas:persistida:"
+PROCESADAS_KEY = "tareas:procesadas"
+WORKERS_KEY = "tareas:workers"
+LOTES_KEY = "tareas:lotes"
+
+TAREA_DURACION = float(os.getenv("TAREA_DURACION", "2"))  # simula tiempo de ejecución
+VISIBILITY_TIMEOUT = float(os.getenv("TAREAS_VISIBILITY_TIMEOUT", "30"))
+MAX_INTENTOS = int(os.getenv("TAREAS_MAX_INTENTOS", "3"))
+BATCH_SIZE = int(os.getenv("TAREAS_BATCH_SIZE", "10"))
+BATCH_MAX_LATENCY = float(os.getenv("TAREAS_BATCH_MAX_LATENCY_MS", "100")) / 1000
+LOTES_HISTORIAL = 20  # mediciones de lotes que se conservan en Redis
+HEARTBEAT_TTL = 10  # segundos sin latido para considerar un worker inactivo
+PERSISTIDA_TTL = 86400  # recuerda las tareas ya persistidas para no duplicarlas
+ERROR_BACKOFF_MAX = float(os.getenv("TAREAS_ERROR_BACKOFF_MAX", "30"))  # espera máxima tras un error del consumidor
+
+_drenado_lock = threading.Lock()
+
+# Saca la tarea de la lista de procesamiento y la reencola (o la envía a
+# fallidas) en un solo paso, para que dos reapers no la dupliquen
+_reencolar = queue.register_script("""
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('RPUSH', KEYS[3], ARGV[2])
+return 1
+""")
+
+
+# Extiende el vencimiento de las tareas que siguen en vuelo; retorna las que
+# ya no lo están (el reaper las devolvió a la cola y ahora son de otro worker)
+_renovar = queue.register_script("""
+local perdidas = {}
+for i = 2, #ARGV do
+    if redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1 then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[1])
+    else
+        table.insert(perdidas, ARGV[i])
+    end
+end
+return perdidas
+""")
+
+
+def encolar_tarea(tarea):
+    """Envía una tarea a la cola, envuelta con un job_id y su contador de intentos"""
+    encolar_tareas([tarea])
+
+
+def encolar_tareas(tareas):
+    """Envía un lote de tareas a la cola con un único RPUSH"""
+    if tareas:
+        queue.rpush(QUEUE_KEY, *(
+            json.dumps({"job_id": uuid.uuid4().hex, "intentos": 0, "tarea": tarea}) for tarea in tareas
+        ))
+
+
+def lista_procesando(worker_id):
+    """Lista de procesamiento (tareas en vuelo) de un worker"""
+    return f"{PROCESANDO_PREFIX}{worker_id}"
+
+
+def _leer_mensaje(payload):
+    """Interpreta un elemento de la cola (admite tareas encoladas sin envoltorio)"""
+    mensaje = json.loads(payload)
+    if "tarea" not in mensaje:
+        mensaje = {"job_id": None, "intentos": 0, "tarea": mensaje}
+    mensaje["payload"] = payload
+    return mensaje
+
+
+def tomar_lote(worker_id, tamano=1, max_latencia=0, timeout=None):
+    """
+    Mueve hasta 'tamano' tareas a la lista de procesamiento del worker y
+    registra su vencimiento. La primera bloquea con BLMOVE si hay timeout;
+    el resto se toma con LMOVE en un pipeline (un solo round trip), esperando
+    como máximo 'max_latencia' segundos a que el lote se complete.
+    """
+    procesando = lista_procesando(worker_id)
+    if timeout is None:
+        primero = queue.lmove(QUEUE_KEY, procesando, "LEFT", "RIGHT")
+    else:
+        primero = queue.blmove(QUEUE_KEY, procesando, timeout, "LEFT", "RIGHT")
+    if primero is None:
+        return []
+
+    payloads = [primero]
+    limite = time.monotonic() + max_latencia
+    while len(payloads) < tamano:
+        pipe = queue.pipeline()
+        for _ in range(tamano - len(payloads)):
+            pipe.lmove(QUEUE_KEY, procesando, "LEFT", "RIGHT")
+        payloads.extend(p for p in pipe.execute() if p is not None)
+        restante = limite - time.monotonic()
+        if len(payloads) >= tamano or restante <= 0:
+            break
+        siguiente = queue.blmove(QUEUE_KEY, procesando, restante, "LEFT", "RIGHT")
+        if siguiente is None:
+            break
+        payloads.append(siguiente)
+
+    vencimiento = time.time() + VISIBILITY_TIMEOUT
+    queue.hset(VENCIMIENTOS_KEY, mapping={p: vencimiento for p in payloads})
+    return [_leer_mensaje(p) for p in payloads]
+
+
+def renovar_vencimientos(mensajes):
+    """
+    Extiende el visibility timeout de las tareas del lote que siguen en vuelo.
+    Retorna el conjunto de payloads que el reaper ya devolvió a la cola.
+    """
+    if not mensajes:
+        return set()
+    perdidas = _renovar(keys=[VENCIMIENTOS_KEY], args=[time.time() + VISIBILITY_TIMEOUT] + [m["payload"] for m in mensajes])
+    return set(perdidas)
+
+
+def _ya_persistidas(mensajes):
+    """
+    Retorna {job_id: tarea_id} de las tareas que ya persistió algún worker.
+    Primero consulta las marcas de Redis (un MGET); los job_id sin marca se
+    buscan en el repositorio, donde cada tarea guarda su job_id en la misma
+    escritura que la persiste (la marca puede faltar si el ack no llegó).
+    """
+    job_ids = [m["job_id"] for m in mensajes if m["job_id"]]
+    if not job_ids:
+        return {}
+    valores = queue.mget([f"{PERSISTIDA_PREFIX}{job_id}" for job_id in job_ids])
+    persistidas = {job_id: valor for job_id, valor in zip(job_ids, valores) if valor}
+    persistidas.update(tareas_service.tareas_por_job([j for j in job_ids if j not in persistidas]))
+    return persistidas
+
+
+def confirmar_lote(worker_id, confirmadas, medicion=None):
+    """
+    Ack de un lote en un solo pipeline: marca cada tarea como persistida,
+    la quita de la lista de procesamiento y registra la medición del lote.
+    - confirmadas: lista de (mensaje, tarea_id)
+    """
+    procesando = lista_procesando(worker_id)
+    pipe = queue.pipeline()
+    for mensaje, tarea_id in confirmadas:
+        if mensaje["job_id"]:
+            pipe.set(f"{PERSISTIDA_PREFIX}{mensaje['job_id']}", tarea_id, ex=PERSISTIDA_TTL)
+        pipe.lrem(procesando, 1, mensaje["payload"])
+        pipe.hdel(VENCIMIENTOS_KEY, mensaje["payload"])
+    if medicion:
+        pipe.incrby(PROCESADAS_KEY, medicion["persistidas"])
+        pipe.lpush(LOTES_KEY, json.dumps(medicion))
+        pipe.ltrim(LOTES_KEY, 0, LOTES_HISTORIAL - 1)
+    pipe.execute()
+
+
+def reintentar_tarea(procesando, mensaje):
+    """
+    Devuelve la tarea a la cola con un intento más, o la envía a la lista
+    de fallidas si alcanzó MAX_INTENTOS. Retorna False si ya no estaba en vuelo.
+    """
+    intentos = mensaje["intentos"] + 1
+    destino = FALLIDAS_KEY if intentos >= MAX_INTENTOS else QUEUE_KEY
+    nuevo = json.dumps({
+        "job_id": mensaje["job_id"] or uuid.uuid4().hex,
+        "intentos": intentos,
+        "tarea": mensaje["tarea"]
+    })
+    movida = _reencolar(keys=[procesando, VENCIMIENTOS_KEY, destino], args=[mensaje["payload"], nuevo])
+    if movida and destino == FALLIDAS_KEY:
+        print(f"☠️ Tarea enviada a {FALLIDAS_KEY} tras {intentos} intentos: {mensaje['tarea']}")
+    return bool(movida)
+
+
+def ejecutar_tarea(tarea):
+    """Ejecuta el trabajo de una tarea (simulado)"""
+    print(f"⚙️ Procesando tarea: {tarea['nombre']}")
+    time.sleep(TAREA_DURACION)
+
+
+def ejecutar_lote(worker_id, mensajes, espera=0):
+    """
+    Procesa un lote tomado de la cola: ejecuta cada tarea, persiste todas
+    las nuevas con una sola escritura y confirma el lote en un pipeline.
+    Las reentregas de tareas ya persistidas solo se confirman.
+    Después de cada tarea se extiende el vencimiento de las que siguen en
+    vuelo, para que el reaper no las reencole mientras el lote avanza; antes
+    de persistir se descartan las que el reaper ya devolvió a la cola y se
+    vuelve a consultar cuáles persistió otro worker.
+    Retorna la medición de tiempos del lote.
+    """
+    inicio = time.perf_counter()
+    procesando = lista_procesando(worker_id)
+    persistidas = _ya_persistidas(mensajes)
+
+    confirmadas = []
+    nuevas = []
+    for i, mensaje in enumerate(mensajes):
+        ya_persistida = persistidas.get(mensaje["job_id"])
+        if ya_persistida:
+            confirmadas.append((mensaje, ya_persistida))
+            continue
+        try:
+            ejecutar_tarea(mensaje["tarea"])
+            nuevas.append(mensaje)
+        except Exception as e:
+            print(f"Error al procesar tarea {mensaje['tarea']}: {e}")
+            reintentar_tarea(procesando, mensaje)
+        renovar_vencimientos(nuevas + mensajes[i + 1:])
+    fin_proceso = time.perf_counter()
+
+    if nuevas:
+        perdidas = renovar_vencimientos(nuevas)
+        if perdidas:
+            print(f"⏱️ {len(perdidas)} tareas vencieron durante el lote; las procesará otro worker")
+        nuevas = [m for m in nuevas if m["payload"] not in perdidas]
+        persistidas = _ya_persistidas(nuevas)
+        confirmadas.extend((m, persistidas[m["job_id"]]) for m in nuevas if m["job_id"] in persistidas)
+        nuevas = [m for m in nuevas if m["job_id"] not in persistidas]
+
+    if nuevas:
+        for mensaje in nuevas:
+            if mensaje["job_id"]:
+                mensaje["tarea"]["job_id"] = mensaje["job_id"]
+        try:
+            tareas_service.add_tareas([m["tarea"] for m in nuevas])
+        except Exception as e:
+            print(f"Error al persistir lote de {len(nuevas)} tareas: {e}")
+            for mensaje in nuevas:
+                reintentar_tarea(procesando, mensaje)
+            nuevas = []
+        confirmadas.extend((m, m["tarea"]["id"]) for m in nuevas)
+    fin_persistencia = time.perf_counter()
+
+    medicion = {
+        "worker": worker_id,
+        "tamano": len(mensajes),
+        "persistidas": len(nuevas),
+        "espera_ms": round(espera * 1000, 2),
+        "proceso_ms": round((fin_proceso - inicio) * 1000, 2),
+        "persistencia_ms": round((fin_persistencia - fin_proceso) * 1000, 2),
+        "total_ms": round((espera + fin_persistencia - inicio) * 1000, 2),
+        "timestamp": time.time()
+    }
+    confirmar_lote(worker_id, confirmadas, medicion)
+    return medicion
+
+
+def recuperar_vencidas():
+    """
+    Reaper: reencola las tareas en vuelo cuyo visibility timeout venció.
+    Las tareas sin vencimiento registrado (worker caído justo después de
+    tomarlas) reciben uno nuevo y se recuperan en una pasada posterior.
+    """
+    ahora = time.time()
+    recuperadas = 0
+    for procesando in queue.scan_iter(match=f"{PROCESANDO_PREFIX}*"):
+        for payload in queue.lrange(procesando, 0, -1):
+            vencimiento = queue.hget(VENCIMIENTOS_KEY, payload)
+            if vencimiento is None:
+                queue.hsetnx(VENCIMIENTOS_KEY, payload, ahora + VISIBILITY_TIMEOUT)
+            elif float(vencimiento) < ahora:
+                if reintentar_tarea(procesando, _leer_mensaje(payload)):
+                    recuperadas += 1
+    if recuperadas:
+        print(f"♻️ {recuperadas} tareas vencidas devueltas a la cola")
+    return recuperadas
+
+
+def latido(worker_id):
+    """Registra que el worker sigue activo"""
+    queue.zadd(WORKERS_KEY, {worker_id: time.time()})
+
+
+def baja_worker(worker_id):
+    """Quita al worker del registro de workers activos"""
+    queue.zrem(WORKERS_KEY, worker_id)
+
+
+def consumir(worker_id, detener, timeout=1):
+    """
+    Bucle de un worker: bloquea en BLMOVE hasta que llega una tarea y
+    procesa lotes de hasta TAREAS_BATCH_SIZE. Termina cuando se activa el
+    evento 'detener', luego de completar el lote en curso.
+    Un error (p. ej. Redis reiniciándose) no termina el consumidor: se
+    registra y se reintenta con una espera creciente hasta ERROR_BACKOFF_MAX.
+    Las tareas que quedaron en vuelo las recupera el reaper.
+    """
+    espera_error = 0
+    while not detener.is_set():
+        try:
+            latido(worker_id)
+            inicio = time.perf_counter()
+            mensajes = tomar_lote(worker_id, BATCH_SIZE, BATCH_MAX_LATENCY, timeout=timeout)
+            if mensajes:
+                ejecutar_lote(worker_id, mensajes, espera=time.perf_counter() - inicio)
+            espera_error = 0
+        except Exception as e:
+            espera_error = min(ERROR_BACKOFF_MAX, espera_error * 2 or 0.5)
+            print(f"Error en el worker {worker_id}: {e}; reintentando en {espera_error:.1f}s")
+            detener.wait(espera_error)
+    try:
+        baja_worker(worker_id)
+    except Exception as e:
+        print(f"No se pudo dar de baja el worker {worker_id}: {e}")
+
+
+def reaper(detener, intervalo):
+    """Bucle del reaper: recupera tareas vencidas cada 'intervalo' segundos"""
+    while not detener.wait(intervalo):
+        try:
+            recuperar_vencidas()
+        except Exception as e:
+            print(f"Error en el reaper de tareas: {e}")
+
+
+def _drenar():
+    """Procesa la cola en el proceso web hasta vaciarla (sin workers dedicados)"""
+    worker_id = f"web:{socket.gethostname()}:{os.getpid()}"
+    try:
+        while True:
+            inicio = time.perf_counter()
+            mensajes = tomar_lote(worker_id, BATCH_SIZE)
+            if not mensajes:
+                break
+            ejecutar_lote(worker_id, mensajes, espera=time.perf_counter() - inicio)
+    finally:
+        _drenado_lock.release()
+
+
+def workers_activos():
+    """Cantidad de workers con latido reciente"""
+    return queue.zcount(WORKERS_KEY, time.time() - HEARTBEAT_TTL, "+inf")
+
+
+def disparar_procesamiento():
+    """
+    Dispara el procesamiento sin bloquear: si no hay workers dedicados
+    activos, recupera las tareas vencidas y drena la cola en un hilo en
+    segundo plano (uno a la vez). Retorna True si se inició un drenado local.
+    """
+    if workers_activos() > 0:
+        return False
+    recuperar_vencidas()
+    if queue.llen(QUEUE_KEY) == 0:
+        return False
+    if not _drenado_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_drenar, daemon=True).start()
+    return True
+
+
+def estado_cola():
+    """Estado actual de la cola y de los workers"""
+    pipe = queue.pipeline()
+    pipe.llen(QUEUE_KEY)
+    pipe.hlen(VENCIMIENTOS_KEY)
+    pipe.llen(FALLIDAS_KEY)
+    pipe.get(PROCESADAS_KEY)
+    pipe.zcount(WORKERS_KEY, time.time() - HEARTBEAT_TTL, "+inf")
+    pipe.lrange(LOTES_KEY, 0, LOTES_HISTORIAL - 1)
+    pendientes, en_proceso, fallidas, procesadas, workers, lotes = pipe.execute()
+    return {
+        "pendientes": pendientes,
+        "en_proceso": en_proceso,
+        "fallidas": fallidas,
+        "procesadas": int(procesadas or 0),
+        "workers_activos": workers,
+        "batch_size": BATCH_SIZE,
+        "ultimos_lotes": [json.loads(lote) for lote in lotes]
+    }
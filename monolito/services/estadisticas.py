@@ -0,0 +1,177 @@
+"""
+Estadísticas materializadas en hashes de Redis.
+Cada alta incrementa los totales por colección y los desgloses de tareas
+por proyecto y proyectos por usuario, de modo que consultarlas no recorre
+las colecciones. Si los hashes no existen (primer uso o Redis reiniciado)
+se reconstruyen una vez desde los repositorios.
+
+Las altas y la reconstrucción se excluyen mutuamente: cada alta se anota
+en un sorted set de escrituras en curso antes de persistir y se quita al
+incrementar los contadores, y la reconstrucción solo publica su resultado
+si no hubo escrituras en curso mientras contaba. Así un alta nunca queda
+contada dos veces (por la reconstrucción y por su incremento) ni ninguna.
+"""
+from collections import Counter
+import time
+import uuid
+import redis
+from services.redis_client import redis_client
+
+TOTALES_KEY = "estadisticas:totales"
+TAREAS_POR_PROYECTO_KEY = "estadisticas:tareas_por_proyecto"
+PROYECTOS_POR_USUARIO_KEY = "estadisticas:proyectos_por_usuario"
+ESCRITURAS_KEY = "estadisticas:escrituras"   # zset token -> inicio (epoch) de las altas en curso
+COLECCIONES = ("usuarios", "proyectos", "tareas")
+MAX_REINTENTOS = 20
+ESPERA_REINTENTO = 0.05
+ESCRITURA_TIMEOUT = 60   # segundos tras los que una escritura en curso se da por abandonada
+
+# Desglose mantenido para cada colección: (hash, campo del registro, nombre en el resultado)
+DESGLOSES = {
+    "proyectos": (PROYECTOS_POR_USUARIO_KEY, "usuario_id", "proyectos_por_usuario"),
+    "tareas": (TAREAS_POR_PROYECTO_KEY, "proyecto_id", "tareas_por_proyecto"),
+}
+
+# Quita la escritura de las que están en curso e incrementa los contadores
+# solo si ya están materializados; si no, la próxima lectura los reconstruye
+# incluyendo este alta.
+# KEYS[1]=totales, KEYS[2]=hash de desglose, KEYS[3]=escrituras en curso;
+# ARGV[1]=token de la escritura, ARGV[2]=colección, ARGV[3]=cantidad,
+# ARGV[4..]=pares (valor del desglose, cantidad)
+_incrementar = redis_client.register_script("""
+redis.call('ZREM', KEYS[3], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+redis.call('HINCRBY', KEYS[1], ARGV[2], ARGV[3])
+for i = 4, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+return 1
+""")
+
+
+def _descartar():
+    """Descarta los totales para que la próxima lectura los reconstruya completos"""
+    try:
+        redis_client.delete(TOTALES_KEY)
+    except redis.RedisError:
+        pass
+
+
+class Escritura:
+    """
+    Alta en curso, para usar alrededor de la persistencia:
+
+        with estadisticas.Escritura() as alta:
+            resultado = repo.add_many(items)
+            alta.registrar(COLECCION, resultado)
+    """
+
+    def __init__(self):
+        self.token = uuid.uuid4().hex
+        self.anotada = False
+        self.registrada = False
+
+    def __enter__(self):
+        try:
+            redis_client.zadd(ESCRITURAS_KEY, {self.token: time.time()})
+            self.anotada = True
+        except redis.RedisError as e:
+            print(f"No se pudo anotar la escritura en curso para las estadísticas: {e}")
+        return self
+
+    def registrar(self, coleccion, items):
+        """Actualiza los contadores luego de persistir un lote de registros"""
+        self.registrada = True
+        if not self.anotada:
+            # Una reconstrucción concurrente pudo no verla: se fuerza otra
+            _descartar()
+            return
+        hash_desglose, campo, _ = DESGLOSES.get(coleccion, (TOTALES_KEY, None, None))
+        pares = []
+        if campo:
+            for valor, cantidad in Counter(item.get(campo) for item in items).items():
+                pares.extend((str(valor), cantidad))
+        try:
+            _incrementar(keys=[TOTALES_KEY, hash_desglose, ESCRITURAS_KEY],
+                         args=[self.token, coleccion, len(items)] + pares)
+        except redis.RedisError as e:
+            # Si no se pudo contar, se descartan para que se reconstruyan completos
+            print(f"No se pudieron actualizar las estadísticas de {coleccion}: {e}")
+            _descartar()
+
+    def __exit__(self, *exc):
+        if self.anotada and not self.registrada:
+            try:
+                redis_client.zrem(ESCRITURAS_KEY, self.token)
+            except redis.RedisError:
+                pass
+        return False
+
+
+def reconstruir():
+    """
+    Recalcula los contadores desde los repositorios. Solo cuenta cuando no hay
+    altas en curso y observa el conjunto de escrituras: si empezó un alta
+    mientras se calculaba, reintenta.
+    """
+    from services import usuarios_service, proyectos_service, tareas_service
+
+    for _ in range(MAX_REINTENTOS):
+        with redis_client.pipeline() as pipe:
+            try:
+                # Escrituras de procesos que murieron sin terminarlas
+                redis_client.zremrangebyscore(ESCRITURAS_KEY, "-inf", time.time() - ESCRITURA_TIMEOUT)
+                pipe.watch(ESCRITURAS_KEY)
+                if pipe.zcard(ESCRITURAS_KEY):
+                    pipe.reset()
+                    time.sleep(ESPERA_REINTENTO)
+                    continue
+                totales = {
+                    "usuarios": usuarios_service.repo.count(),
+                    "proyectos": proyectos_service.repo.count(),
+                    "tareas": tareas_service.repo.count()
+                }
+                por_usuario = Counter(p.get("usuario_id") for p in proyectos_service.repo.all())
+                por_proyecto = Counter(t.get("proyecto_id") for t in tareas_service.repo.all())
+
+                pipe.multi()
+                pipe.delete(TOTALES_KEY, TAREAS_POR_PROYECTO_KEY, PROYECTOS_POR_USUARIO_KEY)
+                pipe.hset(TOTALES_KEY, mapping=totales)
+                if por_proyecto:
+                    pipe.hset(TAREAS_POR_PROYECTO_KEY, mapping={str(k): v for k, v in por_proyecto.items()})
+                if por_usuario:
+                    pipe.hset(PROYECTOS_POR_USUARIO_KEY, mapping={str(k): v for k, v in por_usuario.items()})
+                pipe.execute()
+                print("📊 Estadísticas reconstruidas desde los repositorios")
+                return
+            except redis.WatchError:
+                continue
+    print("No se pudieron reconstruir las estadísticas: demasiadas escrituras concurrentes")
+
+
+def _leer(hashes):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(TOTALES_KEY)
+    for clave in hashes:
+        pipe.hgetall(clave)
+    return pipe.execute()
+
+
+def obtener(desgloses=()):
+    """
+    Retorna {"totales": {...}} leyendo solo los contadores materializados.
+    desgloses: colecciones cuyo desglose se agrega ("tareas" -> "tareas_por_proyecto",
+    "proyectos" -> "proyectos_por_usuario"); cada uno es un HGETALL que crece
+    con la colección agrupada, por lo que solo se leen los pedidos
+    """
+    pedidos = [DESGLOSES[coleccion] for coleccion in desgloses]
+    hashes = [clave for clave, _, _ in pedidos]
+    resultado = _leer(hashes)
+    if not resultado[0]:
+        reconstruir()
+        resultado = _leer(hashes)
+
+    estadisticas = {"totales": {c: int(resultado[0].get(c, 0)) for c in COLECCIONES}}
+    for (_, _, nombre), valores in zip(pedidos, resultado[1:]):
+        estadisticas[nombre] = {k: int(v) for k, v in valores.items()}
+    return estadisticas
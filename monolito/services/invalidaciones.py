@@ -0,0 +1,75 @@
+"""
+Invalidaciones entre procesos mediante Redis pub/sub.
+Cada proceso mantiene un único hilo suscriptor (PSUBSCRIBE al prefijo de
+canales) que despacha los mensajes a los callbacks registrados por canal.
+Al (re)conectarse los callbacks reciben None, porque pudieron perderse
+mensajes mientras no había suscripción.
+"""
+import os
+import threading
+import time
+import redis
+from services.redis_client import redis_client
+
+CANAL_PREFIJO = "invalidaciones:"
+
+_callbacks = {}   # canal -> [callback(mensaje)]
+_lock = threading.Lock()
+_listener_pid = None
+
+
+def publicar(canal, mensaje):
+    """Publica una invalidación para todos los procesos suscriptos"""
+    try:
+        redis_client.publish(f"{CANAL_PREFIJO}{canal}", mensaje)
+    except redis.RedisError as e:
+        print(f"No se pudo publicar invalidación en {canal}: {e}")
+
+
+def suscribir(canal, callback):
+    """Registra un callback para el canal e inicia el hilo suscriptor si hace falta"""
+    with _lock:
+        _callbacks.setdefault(canal, []).append(callback)
+    _asegurar_listener()
+
+
+def _despachar(canal, mensaje):
+    for callback in _callbacks.get(canal, []):
+        try:
+            callback(mensaje)
+        except Exception as e:
+            print(f"Error al aplicar invalidación de {canal}: {e}")
+
+
+def _escuchar():
+    """Hilo suscriptor: se reconecta ante errores de Redis"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(f"{CANAL_PREFIJO}*")
+            for canal in list(_callbacks):
+                _despachar(canal, None)
+            while True:
+                mensaje = pubsub.get_message(timeout=1.0)
+                if mensaje and mensaje["type"] == "pmessage":
+                    _despachar(mensaje["channel"][len(CANAL_PREFIJO):], mensaje["data"])
+        except Exception as e:
+            print(f"Suscripción de invalidaciones interrumpida: {e}")
+            time.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+def _asegurar_listener():
+    """Inicia el hilo suscriptor una vez por proceso"""
+    global _listener_pid
+    with _lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+    threading.Thread(target=_escuchar, daemon=True).start()
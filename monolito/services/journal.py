@@ -0,0 +1,188 @@
+"""
+Motor de almacenamiento append-only para las colecciones del monolito.
+Las altas se agregan como líneas JSON a un journal por colección y las
+lecturas reconstruyen el estado a partir del snapshot (el archivo JSON
+original) más el journal. Un compactador en segundo plano integra el
+journal en un nuevo snapshot mediante un rename atómico.
+Las altas y la compactación toman el lock entre procesos del snapshot, por
+lo que varios workers pueden compartir el mismo journal. Si un proceso muere
+a mitad de una escritura, la línea incompleta se descarta en la siguiente
+alta, y las líneas que no se pueden interpretar se omiten al reconstruir.
+"""
+import json
+import os
+import threading
+import time
+from services.repository import JsonRepository
+from services.archivos import bloqueo, escribir_atomico
+
+# Política de fsync del journal: "always", "interval" o "never"
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "always")
+JOURNAL_FSYNC_INTERVAL = float(os.getenv("JOURNAL_FSYNC_INTERVAL", "1"))
+
+# Compactación en segundo plano
+JOURNAL_COMPACT_INTERVAL = float(os.getenv("JOURNAL_COMPACT_INTERVAL", "30"))
+JOURNAL_COMPACT_MIN_ENTRIES = int(os.getenv("JOURNAL_COMPACT_MIN_ENTRIES", "100"))
+
+
+class JournalRepository(JsonRepository):
+    """
+    Colección con snapshot JSON + journal de líneas JSON.
+    El snapshot es el mismo archivo que usa JsonRepository, por lo que los
+    datos existentes (usuarios.json, proyectos.json, tareas.json) se toman
+    directamente como snapshot inicial.
+    """
+
+    def __init__(self, data_file, indices=()):
+        base = os.path.splitext(data_file)[0]
+        self.journal_file = f"{base}.journal.jsonl"
+        self.compacting_file = f"{self.journal_file}.compactando"
+        self._journal_estado = None   # (inode, offset) de lo ya aplicado
+        self._entradas = 0            # entradas del journal sin compactar
+        self._ultimo_fsync = 0
+        super().__init__(data_file, indices)
+
+        threading.Thread(target=self._compactar_periodicamente, daemon=True).start()
+
+    def _estado_journal_actual(self):
+        """Retorna (inode, tamaño) del journal, o None si no existe"""
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def _recargar_si_cambio(self):
+        """Recarga el snapshot si cambió y aplica las líneas nuevas del journal"""
+        if self._firma_archivo() == self._firma and self._estado_journal_actual() == self._journal_estado:
+            return
+        with self._lock:
+            firma = self._firma_archivo()
+            if firma != self._firma:
+                self._cargar_snapshot(firma)
+            self._aplicar_journal()
+
+    def _cargar_snapshot(self, firma):
+        """Carga el snapshot y un journal de compactación interrumpida, si quedó alguno"""
+        items = []
+        if firma is not None:
+            with open(self.data_file) as f:
+                items = json.load(f)
+        self._reindexar(items)
+        self._firma = firma
+        self._journal_estado = None
+        self._entradas = 0
+        if os.path.exists(self.compacting_file):
+            self._aplicar_lineas(self.compacting_file, 0)
+
+    def _aplicar_lineas(self, path, offset):
+        """Aplica las líneas completas de un journal desde offset; retorna el nuevo offset"""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break  # escritura en curso, se aplica en la próxima lectura
+                offset += len(linea)
+                try:
+                    item = json.loads(linea)
+                except ValueError:
+                    print(f"Línea inválida omitida en {path} (offset {offset - len(linea)})")
+                    continue
+                self._indexar(item)
+                self._entradas += 1
+        return offset
+
+    def _aplicar_journal(self):
+        """Aplica las entradas del journal que todavía no están en memoria"""
+        estado = self._estado_journal_actual()
+        if estado is None:
+            self._journal_estado = None
+            return
+        inode = estado[0]
+        offset = 0
+        if self._journal_estado and self._journal_estado[0] == inode:
+            offset = self._journal_estado[1]
+        offset = self._aplicar_lineas(self.journal_file, offset)
+        self._journal_estado = (inode, offset)
+
+    def _fsync(self, f):
+        """Aplica la política de fsync configurada"""
+        if JOURNAL_FSYNC == "always":
+            os.fsync(f.fileno())
+        elif JOURNAL_FSYNC == "interval":
+            ahora = time.monotonic()
+            if ahora - self._ultimo_fsync >= JOURNAL_FSYNC_INTERVAL:
+                os.fsync(f.fileno())
+                self._ultimo_fsync = ahora
+
+    def _descartar_linea_incompleta(self):
+        """
+        Trunca el journal al último salto de línea. Se llama con el lock tomado,
+        por lo que una línea sin terminar solo puede venir de un proceso que
+        murió a mitad de la escritura; si quedara, la próxima alta se pegaría a ella.
+        """
+        try:
+            f = open(self.journal_file, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            fin = f.seek(0, os.SEEK_END)
+            posicion = fin
+            while posicion > 0:
+                inicio = max(0, posicion - 4096)
+                f.seek(inicio)
+                bloque = f.read(posicion - inicio)
+                salto = bloque.rfind(b"\n")
+                if salto != -1:
+                    posicion = inicio + salto + 1
+                    break
+                posicion = inicio
+            if posicion < fin:
+                print(f"Descartando {fin - posicion} bytes de una escritura incompleta en {self.journal_file}")
+                f.truncate(posicion)
+
+    def add_many(self, items):
+        """Asigna IDs y agrega los registros al journal con una sola escritura"""
+        with self._lock, bloqueo(self.data_file):
+            self._recargar_si_cambio()
+            self._descartar_linea_incompleta()
+            lineas = b"".join(json.dumps(item).encode("utf-8") + b"\n" for item in self._asignar_ids(items))
+            with open(self.journal_file, "ab") as f:
+                f.write(lineas)
+                f.flush()
+                self._fsync(f)
+            self._aplicar_journal()
+        return items
+
+    def compactar(self):
+        """Integra el journal en un nuevo snapshot escrito con rename atómico"""
+        with self._lock, bloqueo(self.data_file):
+            self._recargar_si_cambio()
+            if self._estado_journal_actual() is None and not os.path.exists(self.compacting_file):
+                return False
+
+            # Las altas posteriores van a un journal nuevo mientras se compacta
+            if self._journal_estado is not None:
+                offset = self._journal_estado[1]
+                os.replace(self.journal_file, self.compacting_file)
+                self._aplicar_lineas(self.compacting_file, offset)
+
+            escribir_atomico(self.data_file, json.dumps([self._items[item_id] for item_id in self._ids], indent=4))
+            os.remove(self.compacting_file)
+
+            self._firma = self._firma_archivo()
+            self._journal_estado = None
+            self._entradas = 0
+            self._aplicar_journal()
+        return True
+
+    def _compactar_periodicamente(self):
+        """Hilo compactador: compacta cuando el journal acumula suficientes entradas"""
+        while True:
+            time.sleep(JOURNAL_COMPACT_INTERVAL)
+            try:
+                self._recargar_si_cambio()
+                if self._entradas >= JOURNAL_COMPACT_MIN_ENTRIES:
+                    self.compactar()
+            except Exception as e:
+                print(f"Error al compactar {self.journal_file}: {e}")
@@ -0,0 +1,144 @@
+"""
+Precalentamiento y refresh-ahead de la cache para los proyectos más leídos.
+- Los accesos a GET /proyectos/<id> se cuentan en memoria y se vuelcan
+  periódicamente a un sorted set de Redis (cache:accesos:proyectos) con
+  ZINCRBY en un pipeline; los puntajes decaen a la mitad cada
+  CACHE_ACCESOS_DECAY segundos (una vez entre todos los workers) para
+  seguir a las claves calientes actuales.
+- Al iniciar, antes de que /health reporte "ok", se cargan en cache los
+  CACHE_WARMUP_TOP proyectos más accedidos (un MGET + una lectura + SETEX).
+- Un hilo en segundo plano recarga cada CACHE_REFRESH_INTERVAL segundos las
+  entradas calientes que están por vencer, para que nunca expiren en el
+  camino de un request. Con varios workers, un lock en Redis hace que solo
+  uno refresque por ciclo.
+"""
+import os
+import threading
+import time
+from collections import Counter
+import redis
+from services.redis_client import redis_client
+from services import cache
+
+CACHE_WARMUP_TOP = int(os.getenv("CACHE_WARMUP_TOP", "100"))
+CACHE_REFRESH_INTERVAL = float(os.getenv("CACHE_REFRESH_INTERVAL", "10"))   # 0 desactiva el refresco
+CACHE_REFRESH_MARGIN = float(os.getenv("CACHE_REFRESH_MARGIN", str(cache.CACHE_TTL / 2)))
+CACHE_ACCESOS_MAX = int(os.getenv("CACHE_ACCESOS_MAX", "10000"))   # ids con contador en el sorted set
+CACHE_ACCESOS_DECAY = float(os.getenv("CACHE_ACCESOS_DECAY", "3600"))
+
+ACCESOS_PREFIX = "cache:accesos:"
+DECAIMIENTO_KEY = "cache:accesos:decaimiento"
+LOCK_REFRESCO_KEY = "cache:refresco:lock"
+
+_accesos = {}   # coleccion -> Counter de ids aún no volcados a Redis
+_accesos_lock = threading.Lock()
+_listo = threading.Event()
+_hilo_pid = None
+
+
+def _colecciones():
+    """Colecciones con precalentamiento: nombre -> lectura directa del repositorio por ids"""
+    from services import proyectos_service
+    return {proyectos_service.COLECCION: proyectos_service.repo.get_many}
+
+
+def registrar_acceso(coleccion, item_id):
+    """Cuenta un acceso en memoria; se vuelca a Redis en el próximo ciclo"""
+    with _accesos_lock:
+        _accesos.setdefault(coleccion, Counter())[item_id] += 1
+
+
+def _volcar_accesos():
+    """Vuelca los contadores locales al sorted set de cada colección con un solo pipeline"""
+    global _accesos
+    with _accesos_lock:
+        pendientes, _accesos = _accesos, {}
+    if not pendientes:
+        return
+
+    pipe = redis_client.pipeline(transaction=False)
+    for coleccion, contador in pendientes.items():
+        clave = f"{ACCESOS_PREFIX}{coleccion}"
+        for item_id, cantidad in contador.items():
+            pipe.zincrby(clave, cantidad, item_id)
+        # Solo se conservan los ids más accedidos
+        pipe.zremrangebyrank(clave, 0, -(CACHE_ACCESOS_MAX + 1))
+    try:
+        pipe.execute()
+    except redis.RedisError:
+        # Se reintentan en el próximo ciclo
+        with _accesos_lock:
+            for coleccion, contador in pendientes.items():
+                _accesos.setdefault(coleccion, Counter()).update(contador)
+        raise
+
+
+def _decaer_accesos():
+    """Reduce a la mitad los puntajes, como mucho una vez cada CACHE_ACCESOS_DECAY segundos"""
+    if not redis_client.set(DECAIMIENTO_KEY, 1, nx=True, ex=max(1, int(CACHE_ACCESOS_DECAY))):
+        return
+    pipe = redis_client.pipeline(transaction=False)
+    for coleccion in _colecciones():
+        clave = f"{ACCESOS_PREFIX}{coleccion}"
+        pipe.zunionstore(clave, {clave: 0.5})
+    pipe.execute()
+
+
+def calientes(coleccion, cantidad=CACHE_WARMUP_TOP):
+    """Ids más accedidos de la colección, de mayor a menor"""
+    return [int(item_id) for item_id in redis_client.zrevrange(f"{ACCESOS_PREFIX}{coleccion}", 0, cantidad - 1)]
+
+
+def _refrescar(margen):
+    """Recarga las entradas calientes que faltan o vencen en menos de margen segundos"""
+    recargadas = 0
+    for coleccion, cargar in _colecciones().items():
+        recargadas += cache.refrescar(coleccion, calientes(coleccion), cargar, margen)
+    return recargadas
+
+
+def precalentar():
+    """Carga en cache los proyectos más accedidos que no estén ya cacheados"""
+    inicio = time.monotonic()
+    try:
+        # Margen 0: solo las claves que faltan (PTTL -2); las vigentes las mantiene el refresco
+        recargadas = _refrescar(margen=0)
+        print(f"🔥 Cache precalentada: {recargadas} entradas en {time.monotonic() - inicio:.2f}s")
+    except Exception as e:
+        # Sin Redis no hay nada que precalentar: el servicio igual queda disponible
+        print(f"No se pudo precalentar la cache: {e}")
+    finally:
+        _listo.set()
+
+
+def listo():
+    """Indica si el precalentamiento de este proceso terminó"""
+    return _listo.is_set()
+
+
+def _ciclo_refresco():
+    """Un ciclo del refresco: vuelca accesos y, si obtiene el lock, recarga las claves calientes"""
+    _volcar_accesos()
+    if redis_client.set(LOCK_REFRESCO_KEY, os.getpid(), nx=True, px=int(CACHE_REFRESH_INTERVAL * 1000)):
+        _decaer_accesos()
+        _refrescar(margen=CACHE_REFRESH_MARGIN)
+
+
+def _ejecutar():
+    if not listo():
+        precalentar()
+    while CACHE_REFRESH_INTERVAL > 0:
+        time.sleep(CACHE_REFRESH_INTERVAL)
+        try:
+            _ciclo_refresco()
+        except Exception as e:
+            print(f"Error en el refresco anticipado de la cache: {e}")
+
+
+def iniciar():
+    """Inicia el precalentamiento y el hilo de refresco, una vez por proceso"""
+    global _hilo_pid
+    if _hilo_pid == os.getpid():
+        return
+    _hilo_pid = os.getpid()
+    threading.Thread(target=_ejecutar, daemon=True).start()
@@ -2,24 +2,56 @@
 Servicio de proyectos - funciones compartidas para acceso directo a datos
 (en lugar de hacer requests HTTP)
 """
-import json
-import os
+from services.repository import crear_repositorio
+from services import cache, estadisticas
 
 DATA_FILE = "proyectos.json"
+COLECCION = "proyectos"
+
+# Índice secundario para listar los proyectos de un usuario
+repo = crear_repositorio(DATA_FILE, indices=("usuario_id",))
 
 def get_proyectos():
-    """Obtiene todos los proyectos"""
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE) as f:
-        return json.load(f)
+    """Obtiene todos los proyectos (cacheado)"""
+    return cache.obtener(COLECCION, "todos", repo.all)
+
+def get_proyectos_pagina(cursor=None, limit=None):
+    """Obtiene hasta limit proyectos con id mayor a cursor (cacheado)"""
+    return cache.obtener(COLECCION, f"pagina:{cursor}:{limit}", lambda: repo.page(cursor, limit))
 
 def get_proyecto_by_id(proyecto_id):
-    """Obtiene un proyecto por ID"""
-    proyectos = get_proyectos()
-    return next((p for p in proyectos if p["id"] == proyecto_id), None)
+    """Obtiene un proyecto por ID (cacheado)"""
+    return cache.obtener(COLECCION, f"id:{proyecto_id}", lambda: repo.get(proyecto_id))
+
+def get_proyectos_por_ids(ids):
+    """Obtiene {id: proyecto} para los ids que existen (un MGET; los faltantes en una sola lectura del repositorio)"""
+    return cache.obtener_varios(COLECCION, ids, repo.get_many)
+
+def get_proyectos_por_usuario(usuario_id, cursor=None, limit=None):
+    """Obtiene hasta limit proyectos del usuario con id mayor a cursor, usando el índice (cacheado)"""
+    return cache.obtener(COLECCION, f"usuario:{usuario_id}:{cursor}:{limit}",
+                         lambda: repo.find_by("usuario_id", usuario_id, cursor, limit))
 
 def proyecto_exists(proyecto_id):
     """Verifica si un proyecto existe"""
-    return get_proyecto_by_id(proyecto_id) is not None
+    return repo.exists(proyecto_id)
+
+def proyectos_existentes(ids):
+    """Retorna el conjunto de ids de proyectos que existen"""
+    return repo.existing_ids(ids)
+
+def add_proyecto(proyecto):
+    """Asigna ID y persiste un nuevo proyecto"""
+    with estadisticas.Escritura() as alta:
+        resultado = repo.add(proyecto)
+        alta.registrar(COLECCION, [resultado])
+    cache.invalidar(COLECCION)
+    return resultado
 
+def add_proyectos(proyectos):
+    """Asigna IDs y persiste un lote de proyectos en una sola escritura"""
+    with estadisticas.Escritura() as alta:
+        resultado = repo.add_many(proyectos)
+        alta.registrar(COLECCION, resultado)
+    cache.invalidar(COLECCION)
+    return resultado
@@ -0,0 +1,255 @@
+"""
+Capa de repositorios para las colecciones del monolito.
+Define la interfaz común de los backends de almacenamiento y la
+implementación por defecto sobre archivos JSON, que mantiene cada
+colección indexada por id en memoria y solo vuelve a leer el archivo
+cuando cambia su inode, mtime o tamaño. Las escrituras toman un lock entre procesos y
+reemplazan el archivo de forma atómica, de modo que varios workers pueden
+compartir la colección sin pisarse. Los ids nuevos se reservan en la
+secuencia de la colección (services/secuencias.py).
+
+Los repositorios pueden mantener índices secundarios sobre campos de los
+registros (ej. tareas.proyecto_id) para buscar por valor en tiempo
+proporcional al resultado.
+"""
+import bisect
+import json
+import os
+import threading
+from services.archivos import bloqueo, escribir_atomico
+from services.secuencias import Secuencia
+
+# Backend de almacenamiento: "json" (archivo completo), "journal" (append-only) o "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+
+
+class Repository:
+    """Interfaz común de los backends de almacenamiento de una colección"""
+
+    def all(self):
+        """Obtiene todos los registros ordenados por id"""
+        raise NotImplementedError
+
+    def get(self, item_id):
+        """Obtiene un registro por ID, o None si no existe"""
+        raise NotImplementedError
+
+    def exists(self, item_id):
+        """Verifica si existe un registro con ese ID"""
+        return self.get(item_id) is not None
+
+    def get_many(self, ids):
+        """Obtiene {id: registro} para los ids que existen"""
+        items = ((item_id, self.get(item_id)) for item_id in set(ids))
+        return {item_id: item for item_id, item in items if item is not None}
+
+    def count(self):
+        """Cantidad de registros de la colección"""
+        raise NotImplementedError
+
+    def max_id(self):
+        """Máximo id de la colección, o 0 si está vacía"""
+        return max((item["id"] for item in self.all()), default=0)
+
+    def existing_ids(self, ids):
+        """Retorna el subconjunto de ids que existen en la colección"""
+        return {item_id for item_id in set(ids) if self.exists(item_id)}
+
+    def page(self, after_id=None, limit=None):
+        """Obtiene hasta limit registros con id mayor a after_id (paginación por keyset)"""
+        items = [item for item in self.all() if after_id is None or item["id"] > after_id]
+        return items if limit is None else items[:limit]
+
+    def find_by(self, campo, valor, after_id=None, limit=None):
+        """Obtiene los registros con campo == valor, ordenados por id y paginados por keyset"""
+        items = [item for item in self.page(after_id) if item.get(campo) == valor]
+        return items if limit is None else items[:limit]
+
+    def add(self, item):
+        """Asigna un nuevo ID al registro y lo persiste"""
+        return self.add_many([item])[0]
+
+    def add_many(self, items):
+        """Asigna IDs consecutivos a los registros y los persiste en una sola escritura"""
+        raise NotImplementedError
+
+    def _asignar_ids(self, items):
+        """Asigna a los registros un bloque de IDs consecutivos reservado en la secuencia"""
+        primero = self.secuencia.reservar(len(items))
+        for offset, item in enumerate(items):
+            item["id"] = primero + offset
+        return items
+
+
+class JsonRepository(Repository):
+    """
+    Colección persistida en un archivo JSON e indexada por id en memoria.
+    - indices: campos con índice secundario en memoria (valor -> ids ordenados)
+    """
+
+    def __init__(self, data_file, indices=()):
+        self.data_file = data_file
+        self._lock = threading.RLock()
+        self._items = {}
+        self._ids = []      # ids ordenados, para paginar con bisect
+        self._indices = {campo: {} for campo in indices}
+        self._firma = None
+
+        # Crear archivo JSON si no existe
+        if not os.path.exists(self.data_file):
+            with bloqueo(self.data_file):
+                if not os.path.exists(self.data_file):
+                    escribir_atomico(self.data_file, "[]")
+
+        nombre = os.path.splitext(os.path.basename(data_file))[0]
+        self.secuencia = Secuencia(nombre, f"{os.path.splitext(data_file)[0]}.seq", self.max_id)
+        self.secuencia.sembrar()
+
+    def _firma_archivo(self):
+        """Retorna (inode, mtime, tamaño) del archivo, o None si no existe"""
+        try:
+            stat = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _recargar_si_cambio(self):
+        """Vuelve a cargar el archivo solo si cambió desde la última lectura"""
+        firma = self._firma_archivo()
+        if firma == self._firma:
+            return
+        with self._lock:
+            firma = self._firma_archivo()
+            if firma == self._firma:
+                return
+            items = []
+            if firma is not None:
+                with open(self.data_file) as f:
+                    items = json.load(f)
+            self._reindexar(items)
+            self._firma = firma
+
+    def _reindexar(self, items):
+        """Reconstruye los índices en memoria a partir de la lista completa"""
+        self._items = {item["id"]: item for item in items}
+        self._ids = sorted(self._items)
+        for campo in self._indices:
+            indice = self._indices[campo] = {}
+            for item_id in self._ids:
+                valor = self._items[item_id].get(campo)
+                if _indexable(valor):
+                    indice.setdefault(valor, []).append(item_id)
+
+    def _indexar(self, item):
+        """Agrega o reemplaza un registro en los índices en memoria"""
+        item_id = item["id"]
+        anterior = self._items.get(item_id)
+        if anterior is None:
+            _insertar_ordenado(self._ids, item_id)
+        for campo, indice in self._indices.items():
+            valor = item.get(campo)
+            if anterior is not None:
+                valor_anterior = anterior.get(campo)
+                if valor_anterior == valor:
+                    continue
+                if _indexable(valor_anterior) and item_id in indice.get(valor_anterior, ()):
+                    indice[valor_anterior].remove(item_id)
+            if _indexable(valor):
+                _insertar_ordenado(indice.setdefault(valor, []), item_id)
+        self._items[item_id] = item
+
+    def all(self):
+        """Obtiene todos los registros en orden de inserción"""
+        self._recargar_si_cambio()
+        return list(self._items.values())
+
+    def get(self, item_id):
+        """Obtiene un registro por ID en O(1)"""
+        self._recargar_si_cambio()
+        return self._items.get(item_id)
+
+    def exists(self, item_id):
+        """Verifica si existe un registro con ese ID"""
+        self._recargar_si_cambio()
+        return item_id in self._items
+
+    def get_many(self, ids):
+        """Obtiene {id: registro} para los ids que existen, con una sola verificación de recarga"""
+        self._recargar_si_cambio()
+        items = self._items
+        return {item_id: items[item_id] for item_id in set(ids) if item_id in items}
+
+    def count(self):
+        """Cantidad de registros de la colección"""
+        self._recargar_si_cambio()
+        return len(self._items)
+
+    def max_id(self):
+        """Máximo id de la colección en O(1)"""
+        self._recargar_si_cambio()
+        return self._ids[-1] if self._ids else 0
+
+    def existing_ids(self, ids):
+        """Retorna el subconjunto de ids que existen, con una sola verificación de recarga"""
+        self._recargar_si_cambio()
+        return {item_id for item_id in set(ids) if item_id in self._items}
+
+    def page(self, after_id=None, limit=None):
+        """Obtiene hasta limit registros con id mayor a after_id usando bisect"""
+        self._recargar_si_cambio()
+        ids = self._ids
+        inicio = bisect.bisect_right(ids, after_id) if after_id is not None else 0
+        fin = len(ids) if limit is None else inicio + limit
+        return [self._items[item_id] for item_id in ids[inicio:fin]]
+
+    def find_by(self, campo, valor, after_id=None, limit=None):
+        """Busca por un campo; con índice secundario recorre solo los ids de ese valor"""
+        if campo not in self._indices:
+            return super().find_by(campo, valor, after_id, limit)
+        self._recargar_si_cambio()
+        ids = self._indices[campo].get(valor, []) if _indexable(valor) else []
+        inicio = bisect.bisect_right(ids, after_id) if after_id is not None else 0
+        fin = len(ids) if limit is None else inicio + limit
+        return [self._items[item_id] for item_id in ids[inicio:fin]]
+
+    def add_many(self, items):
+        """Agrega los registros con IDs nuevos y reescribe la colección una sola vez"""
+        with self._lock, bloqueo(self.data_file):
+            self._recargar_si_cambio()
+            try:
+                for item in self._asignar_ids(items):
+                    self._indexar(item)
+                escribir_atomico(self.data_file, json.dumps(list(self._items.values()), indent=4))
+            except Exception:
+                # El índice en memoria ya no refleja el archivo: se relee en la próxima lectura
+                self._firma = None
+                raise
+            self._firma = self._firma_archivo()
+        return items
+
+
+def _indexable(valor):
+    """Solo se indexan valores escalares (los JSON anidados no son hashables)"""
+    return valor is not None and not isinstance(valor, (dict, list))
+
+
+def _insertar_ordenado(ids, item_id):
+    """Agrega item_id a una lista ordenada; las altas nuevas van al final en O(1)"""
+    if ids and item_id < ids[-1]:
+        bisect.insort(ids, item_id)
+    else:
+        ids.append(item_id)
+
+
+def crear_repositorio(data_file, indices=()):
+    """
+    Crea el repositorio de una colección según STORAGE_BACKEND
+    - indices: campos por los que se busca con find_by (ej. ("proyecto_id",))
+    """
+    if STORAGE_BACKEND == "journal":
+        from services.journal import JournalRepository
+        return JournalRepository(data_file, indices)
+    if STORAGE_BACKEND == "sqlite":
+        from services.sqlite_backend import SqliteRepository
+        return SqliteRepository(data_file, indices)
+    return JsonRepository(data_file, indices)
@@ -0,0 +1,69 @@
+"""
+Secuencias de ids por colección.
+Cada colección tiene un contador en Redis (secuencia:<coleccion>) que se
+incrementa con INCRBY, de modo que un alta o un lote completo reserva su
+bloque de ids consecutivos en una sola operación O(1), sin recorrer la
+colección. Si Redis no está disponible se usa un archivo de secuencia
+local (<coleccion>.seq) protegido con el lock entre procesos.
+
+La secuencia nunca queda por detrás de los datos: cada reserva recibe el
+máximo id existente como piso, y al iniciar se siembra con él. Así un
+Redis reiniciado o los ids emitidos por el respaldo local no producen
+ids repetidos.
+"""
+import redis
+from services.redis_client import redis_client
+from services.archivos import bloqueo, escribir_atomico
+
+SECUENCIA_PREFIX = "secuencia:"
+
+# Lleva el contador al menos hasta el piso y reserva un bloque de ids.
+# KEYS[1]=clave de la secuencia; ARGV[1]=piso, ARGV[2]=cantidad. Retorna el último id reservado
+_reservar = redis_client.register_script("""
+local piso = tonumber(ARGV[1])
+if tonumber(redis.call('GET', KEYS[1]) or '0') < piso then
+    redis.call('SET', KEYS[1], piso)
+end
+return redis.call('INCRBY', KEYS[1], ARGV[2])
+""")
+
+
+class Secuencia:
+    """
+    Secuencia de ids de una colección.
+    - maximo_actual(): retorna el máximo id persistido (0 si la colección está vacía)
+    """
+
+    def __init__(self, nombre, archivo_local, maximo_actual):
+        self.nombre = nombre
+        self.clave = f"{SECUENCIA_PREFIX}{nombre}"
+        self.archivo_local = archivo_local
+        self._maximo_actual = maximo_actual
+
+    def _leer_local(self):
+        try:
+            with open(self.archivo_local) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _reservar_local(self, piso, cantidad):
+        """Reserva el bloque en el archivo de secuencia local; retorna el último id"""
+        with bloqueo(self.archivo_local):
+            ultimo = max(self._leer_local(), piso) + cantidad
+            escribir_atomico(self.archivo_local, str(ultimo))
+        return ultimo
+
+    def reservar(self, cantidad=1):
+        """Reserva cantidad ids consecutivos y retorna el primero"""
+        piso = self._maximo_actual()
+        try:
+            ultimo = int(_reservar(keys=[self.clave], args=[piso, cantidad]))
+        except redis.RedisError as e:
+            print(f"Secuencia de {self.nombre} sin Redis, usando {self.archivo_local}: {e}")
+            ultimo = self._reservar_local(piso, cantidad)
+        return ultimo - cantidad + 1
+
+    def sembrar(self):
+        """Lleva la secuencia hasta el máximo id existente (al iniciar o luego de importar datos)"""
+        self.reservar(0)
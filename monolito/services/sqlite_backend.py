@@ -0,0 +1,142 @@
+"""
+Backend SQLite para las colecciones del monolito.
+Usa modo WAL para permitir lectores concurrentes con un escritor, una
+conexión por hilo y sentencias parametrizadas constantes (el módulo
+sqlite3 las mantiene preparadas en su caché de sentencias).
+Los índices secundarios son índices de expresión sobre json_extract.
+"""
+import json
+import os
+import sqlite3
+import threading
+from services.repository import Repository
+from services.secuencias import Secuencia
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "monolito.db")
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+SQLITE_MAX_PARAMS = 500  # ids por consulta IN (...)
+
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Obtiene la conexión SQLite del hilo actual, creándola si no existe.
+    Una conexión heredada por fork no se reutiliza.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = sqlite3.connect(SQLITE_PATH, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+class SqliteRepository(Repository):
+    """Colección almacenada en una tabla SQLite (id INTEGER PRIMARY KEY, data JSON)"""
+
+    def __init__(self, data_file, indices=()):
+        self.tabla = os.path.splitext(os.path.basename(data_file))[0]
+        self.secuencia = Secuencia(self.tabla, f"{os.path.splitext(data_file)[0]}.seq", self.max_id)
+        self._sql_all = f"SELECT data FROM {self.tabla} ORDER BY id"
+        self._sql_get = f"SELECT data FROM {self.tabla} WHERE id = ?"
+        self._sql_count = f"SELECT COUNT(*) FROM {self.tabla}"
+        self._sql_page = f"SELECT data FROM {self.tabla} WHERE id > ? ORDER BY id LIMIT ?"
+        self._sql_max_id = f"SELECT COALESCE(MAX(id), 0) FROM {self.tabla}"
+        self._sql_insert = f"INSERT INTO {self.tabla} (id, data) VALUES (?, ?)"
+        self._sql_upsert = f"INSERT OR REPLACE INTO {self.tabla} (id, data) VALUES (?, ?)"
+
+        get_connection().execute(
+            f"CREATE TABLE IF NOT EXISTS {self.tabla} (id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._indices = set()
+        for campo in indices:
+            if not campo.isidentifier():
+                raise ValueError(f"Campo de índice inválido: {campo}")
+            get_connection().execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.tabla}_{campo} "
+                f"ON {self.tabla} (json_extract(data, '$.{campo}'), id)"
+            )
+            self._indices.add(campo)
+        self.secuencia.sembrar()
+
+    def all(self):
+        """Obtiene todos los registros ordenados por id"""
+        return [json.loads(row[0]) for row in get_connection().execute(self._sql_all)]
+
+    def get(self, item_id):
+        """Obtiene un registro por ID usando la clave primaria"""
+        row = get_connection().execute(self._sql_get, (item_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self):
+        """Cantidad de registros de la colección"""
+        return get_connection().execute(self._sql_count).fetchone()[0]
+
+    def max_id(self):
+        """Máximo id de la colección (usa el índice de la clave primaria)"""
+        return get_connection().execute(self._sql_max_id).fetchone()[0]
+
+    def get_many(self, ids):
+        """Obtiene {id: registro} para los ids que existen, consultando en bloques con IN (...)"""
+        ids = list(set(ids))
+        encontrados = {}
+        for inicio in range(0, len(ids), SQLITE_MAX_PARAMS):
+            bloque = ids[inicio:inicio + SQLITE_MAX_PARAMS]
+            marcadores = ",".join("?" * len(bloque))
+            sql = f"SELECT id, data FROM {self.tabla} WHERE id IN ({marcadores})"
+            encontrados.update((row[0], json.loads(row[1])) for row in get_connection().execute(sql, bloque))
+        return encontrados
+
+    def existing_ids(self, ids):
+        """Retorna el subconjunto de ids que existen, consultando en bloques con IN (...)"""
+        ids = list(set(ids))
+        existentes = set()
+        for inicio in range(0, len(ids), SQLITE_MAX_PARAMS):
+            bloque = ids[inicio:inicio + SQLITE_MAX_PARAMS]
+            marcadores = ",".join("?" * len(bloque))
+            sql = f"SELECT id FROM {self.tabla} WHERE id IN ({marcadores})"
+            existentes.update(row[0] for row in get_connection().execute(sql, bloque))
+        return existentes
+
+    def page(self, after_id=None, limit=None):
+        """Obtiene hasta limit registros con id mayor a after_id (keyset sobre la clave primaria)"""
+        params = (after_id if after_id is not None else 0, limit if limit is not None else -1)
+        return [json.loads(row[0]) for row in get_connection().execute(self._sql_page, params)]
+
+    def find_by(self, campo, valor, after_id=None, limit=None):
+        """Busca por un campo indexado usando el índice de expresión (ordenado por id)"""
+        if campo not in self._indices:
+            return super().find_by(campo, valor, after_id, limit)
+        sql = (f"SELECT data FROM {self.tabla} WHERE json_extract(data, '$.{campo}') = ? "
+               f"AND id > ? ORDER BY id LIMIT ?")
+        params = (valor, after_id if after_id is not None else 0, limit if limit is not None else -1)
+        return [json.loads(row[0]) for row in get_connection().execute(sql, params)]
+
+    def add_many(self, items):
+        """Asigna IDs y persiste los registros dentro de una única transacción inmediata"""
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._asignar_ids(items)
+            conn.executemany(self._sql_insert, ((item["id"], json.dumps(item)) for item in items))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return items
+
+    def importar(self, items):
+        """Inserta o reemplaza registros que ya tienen ID (usado por la migración)"""
+        conn = get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(self._sql_upsert, ((item["id"], json.dumps(item)) for item in items))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        # Los ids importados no deben volver a emitirse
+        self.secuencia.sembrar()
@@ -2,24 +2,58 @@
 Servicio de tareas - funciones compartidas para acceso directo a datos
 (en lugar de hacer requests HTTP)
 """
-import json
-import os
+from services.repository import crear_repositorio
+from services import cache, estadisticas
 
 DATA_FILE = "tareas.json"
+COLECCION = "tareas"
+
+# Índices secundarios: tareas de un proyecto, y tarea persistida para cada
+# job_id de la cola (evita escribirla dos veces si se reentrega)
+repo = crear_repositorio(DATA_FILE, indices=("proyecto_id", "job_id"))
 
 def get_tareas():
-    """Obtiene todas las tareas"""
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE) as f:
-        return json.load(f)
+    """Obtiene todas las tareas (cacheado)"""
+    return cache.obtener(COLECCION, "todos", repo.all)
+
+def get_tareas_pagina(cursor=None, limit=None):
+    """Obtiene hasta limit tareas con id mayor a cursor (cacheado)"""
+    return cache.obtener(COLECCION, f"pagina:{cursor}:{limit}", lambda: repo.page(cursor, limit))
 
 def get_tarea_by_id(tarea_id):
-    """Obtiene una tarea por ID"""
-    tareas = get_tareas()
-    return next((t for t in tareas if t["id"] == tarea_id), None)
+    """Obtiene una tarea por ID (cacheado)"""
+    return cache.obtener(COLECCION, f"id:{tarea_id}", lambda: repo.get(tarea_id))
+
+def get_tareas_por_proyecto(proyecto_id, cursor=None, limit=None):
+    """Obtiene hasta limit tareas del proyecto con id mayor a cursor, usando el índice (cacheado)"""
+    return cache.obtener(COLECCION, f"proyecto:{proyecto_id}:{cursor}:{limit}",
+                         lambda: repo.find_by("proyecto_id", proyecto_id, cursor, limit))
+
+def tareas_por_job(job_ids):
+    """Retorna {job_id: id de la tarea} para los job_id de la cola que ya están persistidos"""
+    persistidas = {}
+    for job_id in job_ids:
+        encontradas = repo.find_by("job_id", job_id, limit=1)
+        if encontradas:
+            persistidas[job_id] = encontradas[0]["id"]
+    return persistidas
 
 def tarea_exists(tarea_id):
     """Verifica si una tarea existe"""
-    return get_tarea_by_id(tarea_id) is not None
+    return repo.exists(tarea_id)
+
+def add_tarea(tarea):
+    """Asigna ID y persiste una nueva tarea"""
+    with estadisticas.Escritura() as alta:
+        resultado = repo.add(tarea)
+        alta.registrar(COLECCION, [resultado])
+    cache.invalidar(COLECCION)
+    return resultado
 
+def add_tareas(tareas):
+    """Asigna IDs y persiste un lote de tareas en una sola escritura"""
+    with estadisticas.Escritura() as alta:
+        resultado = repo.add_many(tareas)
+        alta.registrar(COLECCION, resultado)
+    cache.invalidar(COLECCION)
+    return resultado
@@ -0,0 +1,142 @@
+"""
+Almacén de tokens de acceso persistido en archivo.
+Los tokens se indexan por su digest SHA-256 (el archivo no guarda el
+token en claro), con fecha de emisión y de expiración, de modo que
+validar un token es una búsqueda O(1) en un diccionario. Un hilo
+compacta periódicamente el archivo eliminando los tokens expirados.
+Las modificaciones toman un lock entre procesos y reemplazan el archivo
+de forma atómica, para que varios workers compartan el mismo archivo.
+
+Formato del archivo:
+    {"version": 2, "tokens": {"<sha256>": {"descripcion", "emitido", "expira"}}}
+El formato anterior (lista de {"token", "description"}) se migra al cargarlo.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from services.archivos import bloqueo, escribir_atomico
+
+# Vigencia de los tokens emitidos por POST /tokens (y de los migrados del formato anterior)
+TOKEN_TTL = int(os.getenv("TOKEN_TTL", "86400"))
+TOKENS_COMPACT_INTERVAL = float(os.getenv("TOKENS_COMPACT_INTERVAL", "300"))
+
+
+def digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenStore:
+    """Tokens indexados por digest, con expiración y compactación periódica"""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self._lock = threading.RLock()
+        self._tokens = {}   # digest -> {"descripcion", "emitido", "expira"}
+        self._firma = None
+        with self._lock, bloqueo(self.archivo):
+            self._recargar_si_cambio()
+        threading.Thread(target=self._compactar_periodicamente, daemon=True).start()
+
+    def _firma_archivo(self):
+        try:
+            stat = os.stat(self.archivo)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _recargar_si_cambio(self):
+        """Relee el archivo si otro proceso lo modificó; migra el formato anterior"""
+        firma = self._firma_archivo()
+        if firma is not None and firma == self._firma:
+            return
+        try:
+            with open(self.archivo) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {"version": 2, "tokens": {}}
+
+        if isinstance(data, list):
+            # Formato anterior: los tokens no expiraban en el archivo
+            ahora = time.time()
+            self._tokens = {
+                digest(t["token"]): {
+                    "descripcion": t.get("description", ""),
+                    "emitido": ahora,
+                    "expira": ahora + TOKEN_TTL
+                }
+                for t in data if t.get("token")
+            }
+            self._guardar()
+            print(f"Tokens migrados al formato indexado: {len(self._tokens)}")
+        else:
+            self._tokens = data.get("tokens", {})
+            self._firma = firma
+
+    def _guardar(self):
+        """Escribe el archivo completo de forma atómica"""
+        escribir_atomico(self.archivo, json.dumps({"version": 2, "tokens": self._tokens}, indent=4))
+        self._firma = self._firma_archivo()
+
+    def registrar(self, token, descripcion, ttl=TOKEN_TTL):
+        """Registra un token; ttl=None indica que no expira"""
+        ahora = time.time()
+        with self._lock, bloqueo(self.archivo):
+            self._recargar_si_cambio()
+            self._tokens[digest(token)] = {
+                "descripcion": descripcion,
+                "emitido": ahora,
+                "expira": ahora + ttl if ttl is not None else None
+            }
+            self._guardar()
+
+    def contiene(self, token):
+        """Indica si el token está registrado, aunque haya expirado"""
+        with self._lock:
+            self._recargar_si_cambio()
+            return digest(token) in self._tokens
+
+    def vigencia(self, token):
+        """Segundos de vigencia restantes (infinito si no expira), o None si no es válido"""
+        with self._lock:
+            self._recargar_si_cambio()
+            entrada = self._tokens.get(digest(token))
+        if entrada is None:
+            return None
+        if entrada["expira"] is None:
+            return float("inf")
+        restante = entrada["expira"] - time.time()
+        return restante if restante > 0 else None
+
+    def revocar(self, token):
+        """Elimina un token. Retorna True si estaba registrado"""
+        with self._lock, bloqueo(self.archivo):
+            self._recargar_si_cambio()
+            if self._tokens.pop(digest(token), None) is None:
+                return False
+            self._guardar()
+            return True
+
+    def compactar(self):
+        """Elimina los tokens expirados. Retorna cuántos se eliminaron"""
+        ahora = time.time()
+        with self._lock, bloqueo(self.archivo):
+            self._recargar_si_cambio()
+            expirados = [d for d, t in self._tokens.items()
+                         if t["expira"] is not None and t["expira"] <= ahora]
+            for d in expirados:
+                del self._tokens[d]
+            if expirados:
+                self._guardar()
+        return len(expirados)
+
+    def _compactar_periodicamente(self):
+        while True:
+            time.sleep(TOKENS_COMPACT_INTERVAL)
+            try:
+                eliminados = self.compactar()
+                if eliminados:
+                    print(f"🧹 Tokens expirados eliminados: {eliminados}")
+            except Exception as e:
+                print(f"Error al compactar tokens: {e}")
@@ -2,24 +2,50 @@
 Servicio de usuarios - funciones compartidas para acceso directo a datos
 (en lugar de hacer requests HTTP)
 """
-import json
-import os
+from services.repository import crear_repositorio
+from services import cache, estadisticas
 
 DATA_FILE = "usuarios.json"
+COLECCION = "usuarios"
+
+repo = crear_repositorio(DATA_FILE)
 
 def get_usuarios():
-    """Obtiene todos los usuarios"""
-    if not os.path.exists(DATA_FILE):
-        return []
-    with open(DATA_FILE) as f:
-        return json.load(f)
+    """Obtiene todos los usuarios (cacheado)"""
+    return cache.obtener(COLECCION, "todos", repo.all)
+
+def get_usuarios_pagina(cursor=None, limit=None):
+    """Obtiene hasta limit usuarios con id mayor a cursor (cacheado)"""
+    return cache.obtener(COLECCION, f"pagina:{cursor}:{limit}", lambda: repo.page(cursor, limit))
 
 def get_usuario_by_id(usuario_id):
-    """Obtiene un usuario por ID"""
-    usuarios = get_usuarios()
-    return next((u for u in usuarios if u["id"] == usuario_id), None)
+    """Obtiene un usuario por ID (cacheado)"""
+    return cache.obtener(COLECCION, f"id:{usuario_id}", lambda: repo.get(usuario_id))
+
+def get_usuarios_por_ids(ids):
+    """Obtiene {id: usuario} para los ids que existen (un MGET; los faltantes en una sola lectura del repositorio)"""
+    return cache.obtener_varios(COLECCION, ids, repo.get_many)
 
 def usuario_exists(usuario_id):
     """Verifica si un usuario existe"""
-    return get_usuario_by_id(usuario_id) is not None
+    return repo.exists(usuario_id)
+
+def usuarios_existentes(ids):
+    """Retorna el conjunto de ids de usuarios que existen"""
+    return repo.existing_ids(ids)
+
+def add_usuario(usuario):
+    """Asigna ID y persiste un nuevo usuario"""
+    with estadisticas.Escritura() as alta:
+        resultado = repo.add(usuario)
+        alta.registrar(COLECCION, [resultado])
+    cache.invalidar(COLECCION)
+    return resultado
 
+def add_usuarios(usuarios):
+    """Asigna IDs y persiste un lote de usuarios en una sola escritura"""
+    with estadisticas.Escritura() as alta:
+        resultado = repo.add_many(usuarios)
+        alta.registrar(COLECCION, resultado)
+    cache.invalidar(COLECCION)
+    return resultado
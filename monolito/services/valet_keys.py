@@ -0,0 +1,171 @@
+"""
+Valet keys: permisos precompilados y valet keys firmados sin estado.
+En modo "firmado" el valet key lleva sus claims (scopes, métodos,
+restricciones de recursos y expiración) codificados y firmados con HMAC,
+por lo que se valida sin consultar Redis. Redis solo guarda el conjunto
+de valet keys revocados, que cada proceso mantiene en memoria.
+
+Formato: vk1.<claims en base64url>.<firma HMAC-SHA256 en base64url>
+
+Los valet keys firmados solo se emiten y se aceptan con VALET_KEY_MODE=firmado,
+y ese modo exige definir VALET_KEY_SECRET (no hay secreto por defecto).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+import redis
+from services.redis_client import redis_client
+from services import invalidaciones
+
+VALET_KEY_MODE = os.getenv("VALET_KEY_MODE", "redis")   # "redis" o "firmado"
+VALET_KEY_SECRET = os.getenv("VALET_KEY_SECRET", "").encode()
+# Cada cuánto se relee el conjunto de revocados aunque no lleguen invalidaciones
+VALET_KEY_REVOCADOS_REFRESCO = float(os.getenv("VALET_KEY_REVOCADOS_REFRESCO", "30"))
+
+PREFIJO = "vk1."
+REVOCADOS_KEY = "valet_keys:revocados"   # zset jti -> expiración (epoch)
+CANAL_REVOCADOS = "valet_keys"
+
+if VALET_KEY_MODE == "firmado" and not VALET_KEY_SECRET:
+    raise RuntimeError("VALET_KEY_MODE=firmado requiere definir VALET_KEY_SECRET")
+
+
+class PermisosValetKey:
+    """Metadata de un valet key con scopes y métodos precompilados"""
+
+    __slots__ = ("metadata", "scopes", "metodos", "restricciones", "expires_at", "jti")
+
+    def __init__(self, metadata, expires_at=None, jti=None):
+        self.metadata = metadata
+        self.scopes = frozenset(metadata.get("scopes", []))
+        self.metodos = frozenset(metadata.get("allowed_methods", []))
+        self.restricciones = metadata.get("resource_constraints", {})
+        self.expires_at = expires_at or datetime.fromisoformat(metadata["expires_at"])
+        self.jti = jti
+
+    def permite_scope(self, scope):
+        return scope in self.scopes or "*" in self.scopes
+
+    def permite_metodo(self, metodo):
+        return metodo in self.metodos or "*" in self.metodos
+
+
+def _b64(datos):
+    return base64.urlsafe_b64encode(datos).rstrip(b"=").decode()
+
+
+def _desde_b64(texto):
+    return base64.urlsafe_b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _firmar(contenido):
+    return hmac.new(VALET_KEY_SECRET, contenido.encode(), hashlib.sha256).digest()
+
+
+def habilitado():
+    """Indica si se emiten y aceptan valet keys firmados (modo firmado con secreto definido)"""
+    return VALET_KEY_MODE == "firmado" and bool(VALET_KEY_SECRET)
+
+
+def es_firmado(token):
+    return token.startswith(PREFIJO)
+
+
+def emitir(scopes, allowed_methods, resource_constraints, expires_at):
+    """Genera un valet key firmado con los claims embebidos"""
+    if not habilitado():
+        raise RuntimeError("Los valet keys firmados requieren VALET_KEY_MODE=firmado y VALET_KEY_SECRET")
+    claims = {
+        "s": scopes,
+        "m": allowed_methods,
+        "r": resource_constraints,
+        "e": int(expires_at.timestamp()),
+        "j": secrets.token_urlsafe(8)
+    }
+    contenido = PREFIJO + _b64(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{contenido}.{_b64(_firmar(contenido))}"
+
+
+def verificar(token):
+    """
+    Verifica la firma y decodifica los claims de un valet key firmado.
+    Retorna PermisosValetKey, o None si el modo firmado no está habilitado o
+    si el formato o la firma no son válidos.
+    La expiración y la revocación se validan aparte.
+    """
+    if not habilitado():
+        return None
+    contenido, _, firma = token.rpartition(".")
+    if not contenido.startswith(PREFIJO) or not contenido.isascii() or not firma.isascii():
+        return None
+    try:
+        firma = _desde_b64(firma)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(firma, _firmar(contenido)):
+        return None
+    try:
+        claims = json.loads(_desde_b64(contenido[len(PREFIJO):]))
+        expires_at = datetime.fromtimestamp(claims["e"])
+    except (ValueError, KeyError, TypeError, OverflowError, OSError):
+        return None
+    metadata = {
+        "scopes": claims.get("s", []),
+        "allowed_methods": claims.get("m", []),
+        "resource_constraints": claims.get("r", {}),
+        "expires_at": expires_at.isoformat(),
+        "type": "valet_key"
+    }
+    return PermisosValetKey(metadata, expires_at, claims.get("j"))
+
+
+# Conjunto local de revocados: se relee al recibir una invalidación o
+# cuando vence el intervalo de refresco. Si Redis no responde se sigue
+# usando el último conjunto conocido.
+_revocados = frozenset()
+_revocados_vence = 0.0
+_revocados_lock = threading.Lock()
+
+
+def _cargar_revocados():
+    global _revocados, _revocados_vence
+    with _revocados_lock:
+        if _revocados_vence > time.monotonic():
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zremrangebyscore(REVOCADOS_KEY, "-inf", time.time())
+            pipe.zrange(REVOCADOS_KEY, 0, -1)
+            _, jtis = pipe.execute()
+            _revocados = frozenset(jtis)
+        except redis.RedisError as e:
+            print(f"No se pudo leer el conjunto de valet keys revocados: {e}")
+        _revocados_vence = time.monotonic() + VALET_KEY_REVOCADOS_REFRESCO
+
+
+def _invalidar_revocados(mensaje):
+    global _revocados_vence
+    _revocados_vence = 0.0
+
+
+def esta_revocado(permisos):
+    """Indica si el valet key firmado fue revocado (consulta el conjunto local)"""
+    if _revocados_vence <= time.monotonic():
+        _cargar_revocados()
+    return permisos.jti in _revocados
+
+
+def revocar(permisos):
+    """Agrega el valet key firmado al conjunto de revocados hasta su expiración"""
+    redis_client.zadd(REVOCADOS_KEY, {permisos.jti: permisos.expires_at.timestamp()})
+    _invalidar_revocados(None)
+    invalidaciones.publicar(CANAL_REVOCADOS, permisos.jti)
+
+
+invalidaciones.suscribir(CANAL_REVOCADOS, _invalidar_revocados)
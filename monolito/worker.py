@@ -0,0 +1,72 @@
+"""
+Worker dedicado que consume la cola de tareas fuera del ciclo de request.
+Levanta N consumidores concurrentes (hilos o procesos) que bloquean en
+BLMOVE y se detienen de forma ordenada con SIGINT/SIGTERM, más un reaper
+que reencola las tareas cuyo visibility timeout venció.
+
+Uso:
+    python -m worker [--workers N] [--modo hilos|procesos] [--reaper-intervalo S]
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from services import cola_tareas
+
+WORKERS_TAREAS = int(os.getenv("WORKERS_TAREAS", "4"))
+WORKERS_MODO = os.getenv("WORKERS_MODO", "hilos")
+REAPER_INTERVALO = float(os.getenv("TAREAS_REAPER_INTERVALO", "5"))
+
+
+def _consumidor_en_proceso(worker_id, detener):
+    """Punto de entrada de cada proceso consumidor"""
+    # El proceso padre coordina el apagado mediante el evento compartido
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    cola_tareas.consumir(worker_id, detener)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la cola de tareas")
+    parser.add_argument("--workers", type=int, default=WORKERS_TAREAS,
+                        help="cantidad de consumidores concurrentes")
+    parser.add_argument("--modo", choices=["hilos", "procesos"], default=WORKERS_MODO,
+                        help="ejecutar los consumidores como hilos o como procesos")
+    parser.add_argument("--reaper-intervalo", type=float, default=REAPER_INTERVALO,
+                        help="segundos entre pasadas del reaper de tareas vencidas")
+    args = parser.parse_args()
+
+    if args.modo == "procesos":
+        # "spawn": los hilos en segundo plano de este proceso no se heredan (ver gunicorn.conf.py)
+        contexto = multiprocessing.get_context("spawn")
+        detener = contexto.Event()
+        crear = lambda wid: contexto.Process(target=_consumidor_en_proceso, args=(wid, detener))
+    else:
+        detener = threading.Event()
+        crear = lambda wid: threading.Thread(target=cola_tareas.consumir, args=(wid, detener))
+
+    def apagar(signum, frame):
+        print("🛑 Deteniendo workers (se completan las tareas en curso)...")
+        detener.set()
+
+    signal.signal(signal.SIGINT, apagar)
+    signal.signal(signal.SIGTERM, apagar)
+
+    prefijo = f"{socket.gethostname()}:{os.getpid()}"
+    consumidores = [crear(f"{prefijo}:{i}") for i in range(args.workers)]
+    for consumidor in consumidores:
+        consumidor.start()
+    reaper = threading.Thread(target=cola_tareas.reaper, args=(detener, args.reaper_intervalo))
+    reaper.start()
+    print(f"👷 {args.workers} workers ({args.modo}) consumiendo '{cola_tareas.QUEUE_KEY}'")
+
+    for consumidor in consumidores:
+        consumidor.join()
+    reaper.join()
+    print("✅ Workers detenidos")
+
+
+if __name__ == "__main__":
+    main()
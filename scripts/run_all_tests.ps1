@@ -23,7 +23,12 @@ $scripts = @(
     @{Name="Cache-Aside (Rendimiento)"; File="test_cache_aside.ps1"},
     @{Name="Circuit Breaker (Disponibilidad)"; File="test_circuit_breaker.ps1"},
     @{Name="Queue-Based Load Leveling (Rendimiento)"; File="test_queue_load_leveling.ps1"},
-    @{Name="SOAP Endpoint (XML)"; File="test_soap_endpoint.ps1"}
+    @{Name="SOAP Endpoint (XML)"; File="test_soap_endpoint.ps1"},
+    @{Name="Alta masiva (Bulk)"; File="test_bulk.ps1"},
+    @{Name="ETag / If-None-Match (Rendimiento)"; File="test_etag.ps1"},
+    @{Name="Endpoints de relaciones"; File="test_relaciones.ps1"},
+    @{Name="Consultas (filter, sort, fields)"; File="test_consultas.ps1"},
+    @{Name="Multi-get por ids"; File="test_multiget_ids.ps1"}
 )
 
 $scriptDir = Split-Path -Parent $MyInvocation.MyCommand.Path
@@ -54,8 +59,9 @@ Write-Host "TODAS LAS PRUEBAS COMPLETADAS" -ForegroundColor Green
 Write-Host "========================================" -ForegroundColor Green
 Write-Host ""
 Write-Host "Resumen de mejoras demostradas:" -ForegroundColor Cyan
-Write-Host "  - Rendimiento: Cache-Aside, Queue-Based Load Leveling" -ForegroundColor White
+Write-Host "  - Rendimiento: Cache-Aside, Queue-Based Load Leveling, ETag/304" -ForegroundColor White
 Write-Host "  - Disponibilidad: Circuit Breaker" -ForegroundColor White
 Write-Host "  - Integracion: SOAP/XML Endpoint" -ForegroundColor White
+Write-Host "  - API: Alta masiva (bulk), endpoints de relaciones, consultas (filter/sort/fields), multi-get por ids" -ForegroundColor White
 Write-Host ""
 
@@ -0,0 +1,102 @@
+# Script de prueba para los endpoints de alta masiva (/bulk)
+# Verifica los status (201/202, 207 ante fallas parciales, 400) y el resultado por item
+
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host "DEMO: Alta masiva (bulk)" -ForegroundColor Cyan
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host ""
+
+$baseUrl = "http://localhost:5000"
+$apiKey = "supersecreta123"
+$headers = @{"X-API-Key"=$apiKey}
+$fallas = 0
+
+# Ejecuta un request y retorna status y body sin lanzar excepción ante 4xx/5xx
+function Invoke-Api($Method, $Path, $Body = $null, $Headers = @{}) {
+    $params = @{ Uri = "$baseUrl$Path"; Method = $Method; Headers = $Headers; UseBasicParsing = $true }
+    if ($Body -ne $null) {
+        $params.Body = ConvertTo-Json -InputObject $Body -Depth 5
+        $params.ContentType = "application/json"
+    }
+    try {
+        $response = Invoke-WebRequest @params -ErrorAction Stop
+        $status = [int]$response.StatusCode
+        $contenido = $response.Content
+    } catch {
+        if (-not $_.Exception.Response) { throw }
+        $status = [int]$_.Exception.Response.StatusCode
+        $contenido = $_.ErrorDetails.Message
+    }
+    $json = $null
+    if ($contenido) { try { $json = $contenido | ConvertFrom-Json } catch {} }
+    return @{ Status = $status; Json = $json }
+}
+
+function Comprobar($descripcion, $condicion) {
+    if ($condicion) {
+        Write-Host "   [OK] $descripcion" -ForegroundColor Green
+    } else {
+        Write-Host "   [ERROR] $descripcion" -ForegroundColor Red
+        $script:fallas++
+    }
+}
+
+Write-Host "1. Usuarios: todos los items validos..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/usuarios/bulk" @(@{nombre = "Usuario Bulk 1"}, @{nombre = "Usuario Bulk 2"}) $headers
+Comprobar "Status 201 (recibido: $($r.Status))" ($r.Status -eq 201)
+Comprobar "exitosos = 2, fallidos = 0" ($r.Json.exitosos -eq 2 -and $r.Json.fallidos -eq 0)
+Comprobar "Cada resultado trae indice, ok y el usuario con id" `
+    (@($r.Json.resultados | Where-Object { $_.ok -and $_.data.id }).Count -eq 2 -and $r.Json.resultados[1].indice -eq 1)
+$usuarioId = $r.Json.resultados[0].data.id
+
+Write-Host "`n2. Usuarios: falla parcial..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/usuarios/bulk" @{items = @(@{nombre = "Usuario Bulk 3"}, @{apellido = "Sin nombre"})} $headers
+Comprobar "Status 207 (recibido: $($r.Status))" ($r.Status -eq 207)
+Comprobar "exitosos = 1, fallidos = 1" ($r.Json.exitosos -eq 1 -and $r.Json.fallidos -eq 1)
+Comprobar "El item 1 se rechaza con un error" ($r.Json.resultados[1].ok -eq $false -and $r.Json.resultados[1].error)
+
+Write-Host "`n3. Usuarios: ningun item valido o body invalido..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/usuarios/bulk" @(@{apellido = "Sin nombre"}) $headers
+Comprobar "Todos rechazados: status 400 (recibido: $($r.Status))" ($r.Status -eq 400 -and $r.Json.exitosos -eq 0)
+$r = Invoke-Api POST "/usuarios/bulk" @{nombre = "No es una lista"} $headers
+Comprobar "Body sin arreglo de items: status 400 (recibido: $($r.Status))" ($r.Status -eq 400 -and $r.Json.error)
+
+Write-Host "`n4. Proyectos: usuario inexistente en uno de los items..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/proyectos/bulk" @(
+    @{nombre = "Proyecto Bulk 1"; usuario_id = $usuarioId},
+    @{nombre = "Proyecto Bulk 2"; usuario_id = 999999999},
+    @{nombre = "Proyecto Bulk 3"; usuario_id = "1"}
+) $headers
+Comprobar "Status 207 (recibido: $($r.Status))" ($r.Status -eq 207)
+Comprobar "Item 0 creado con id" ($r.Json.resultados[0].ok -and $r.Json.resultados[0].data.id)
+Comprobar "Item 1 rechazado: Usuario no encontrado" ($r.Json.resultados[1].error -eq "Usuario no encontrado")
+Comprobar "Item 2 rechazado: usuario_id debe ser entero" ($r.Json.resultados[2].ok -eq $false)
+$proyectoId = $r.Json.resultados[0].data.id
+
+Write-Host "`n5. Tareas: se encolan las validas..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/tareas/bulk" @(
+    @{nombre = "Tarea Bulk 1"; proyecto_id = $proyectoId},
+    @{nombre = "Tarea Bulk 2"; proyecto_id = $proyectoId}
+) $headers
+Comprobar "Todas validas: status 202 (recibido: $($r.Status))" ($r.Status -eq 202 -and $r.Json.exitosos -eq 2)
+$r = Invoke-Api POST "/tareas/bulk" @(
+    @{nombre = "Tarea Bulk 3"; proyecto_id = $proyectoId},
+    @{nombre = "Tarea Bulk 4"; proyecto_id = 999999999}
+) $headers
+Comprobar "Proyecto inexistente: status 207 (recibido: $($r.Status))" ($r.Status -eq 207)
+Comprobar "Item 1 rechazado: Proyecto no encontrado" ($r.Json.resultados[1].error -eq "Proyecto no encontrado")
+
+Write-Host "`n========================================" -ForegroundColor Cyan
+Write-Host "RESULTADOS:" -ForegroundColor Green
+Write-Host "========================================" -ForegroundColor Cyan
+if ($fallas -eq 0) {
+    Write-Host "Todas las verificaciones pasaron" -ForegroundColor Green
+} else {
+    Write-Host "$fallas verificaciones fallaron" -ForegroundColor Red
+}
+Write-Host "`nBENEFICIOS:" -ForegroundColor Green
+Write-Host "- Un solo request y una sola escritura para muchos registros" -ForegroundColor White
+Write-Host "- Cada item informa su resultado; un item invalido no descarta el lote" -ForegroundColor White
+Write-Host "========================================" -ForegroundColor Cyan
+
+if ($fallas -gt 0) { exit 1 }
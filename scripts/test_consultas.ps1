@@ -0,0 +1,107 @@
+# Script de prueba para el motor de consultas de los endpoints de lista
+# Verifica filter, sort y fields, y los 400 ante parametros invalidos
+
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host "DEMO: Consultas (filter, sort, fields)" -ForegroundColor Cyan
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host ""
+
+$baseUrl = "http://localhost:5000"
+$apiKey = "supersecreta123"
+$headers = @{"X-API-Key"=$apiKey}
+$fallas = 0
+
+# Ejecuta un request y retorna status y body sin lanzar excepción ante 4xx/5xx
+function Invoke-Api($Method, $Path, $Body = $null, $Headers = @{}) {
+    $params = @{ Uri = "$baseUrl$Path"; Method = $Method; Headers = $Headers; UseBasicParsing = $true }
+    if ($Body -ne $null) {
+        $params.Body = ConvertTo-Json -InputObject $Body -Depth 5
+        $params.ContentType = "application/json"
+    }
+    try {
+        $response = Invoke-WebRequest @params -ErrorAction Stop
+        $status = [int]$response.StatusCode
+        $contenido = $response.Content
+    } catch {
+        if (-not $_.Exception.Response) { throw }
+        $status = [int]$_.Exception.Response.StatusCode
+        $contenido = $_.ErrorDetails.Message
+    }
+    $json = $null
+    if ($contenido) { try { $json = $contenido | ConvertFrom-Json } catch {} }
+    return @{ Status = $status; Json = $json }
+}
+
+function Comprobar($descripcion, $condicion) {
+    if ($condicion) {
+        Write-Host "   [OK] $descripcion" -ForegroundColor Green
+    } else {
+        Write-Host "   [ERROR] $descripcion" -ForegroundColor Red
+        $script:fallas++
+    }
+}
+
+Write-Host "1. Creando usuario con tres proyectos..." -ForegroundColor Yellow
+$tag = Get-Random -Maximum 1000000
+$r = Invoke-Api POST "/usuarios" @{nombre = "Usuario Consultas $tag"} $headers
+$usuarioId = $r.Json.data.id
+$r = Invoke-Api POST "/proyectos/bulk" @(
+    @{nombre = "Consulta B $tag"; usuario_id = $usuarioId},
+    @{nombre = "Consulta A $tag"; usuario_id = $usuarioId},
+    @{nombre = "Consulta C $tag"; usuario_id = $usuarioId}
+) $headers
+$proyectos = @($r.Json.resultados | ForEach-Object { $_.data.id })
+if (-not $usuarioId -or $proyectos.Count -ne 3) {
+    Write-Host "   [ERROR] No se pudieron crear los datos de prueba" -ForegroundColor Red
+    exit 1
+}
+Write-Host "   [OK] Usuario $usuarioId, proyectos $($proyectos -join ', ')" -ForegroundColor Green
+
+Write-Host "`n2. filter..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/proyectos?filter=usuario_id:eq:$usuarioId" $null $headers
+Comprobar "usuario_id:eq: status 200 y 3 proyectos (recibido: $($r.Status), $(@($r.Json.data).Count))" `
+    ($r.Status -eq 200 -and @($r.Json.data).Count -eq 3)
+Comprobar "Todos del usuario $usuarioId" (@($r.Json.data | Where-Object { $_.usuario_id -ne $usuarioId }).Count -eq 0)
+$r = Invoke-Api GET "/proyectos?filter=nombre:prefix:Consulta&filter=nombre:contains:$tag" $null $headers
+Comprobar "prefix y contains combinados con AND: 3 proyectos" (@($r.Json.data).Count -eq 3)
+$r = Invoke-Api GET "/proyectos?filter=id:in:$($proyectos[0])|$($proyectos[2])" $null $headers
+Comprobar "id:in: los proyectos pedidos en orden de id" ((($r.Json.data | ForEach-Object { $_.id }) -join ",") -eq "$($proyectos[0]),$($proyectos[2])")
+$r = Invoke-Api GET "/proyectos?filter=usuario_id:eq:$usuarioId&limit=2" $null $headers
+Comprobar "Con limit=2: 2 proyectos y next_cursor" (@($r.Json.data).Count -eq 2 -and $r.Json.next_cursor -eq $proyectos[1])
+$r = Invoke-Api GET "/proyectos?filter=usuario_id:eq:$usuarioId&cursor=$($proyectos[1])" $null $headers
+Comprobar "Con cursor: el proyecto restante" (@($r.Json.data).Count -eq 1 -and $r.Json.data[0].id -eq $proyectos[2])
+
+Write-Host "`n3. sort..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/proyectos?filter=usuario_id:eq:$usuarioId&sort=-nombre" $null $headers
+$nombres = @($r.Json.data | ForEach-Object { $_.nombre })
+Comprobar "sort=-nombre: C, B, A (recibido: $($nombres -join ' | '))" `
+    ($r.Status -eq 200 -and ($nombres -join ",") -eq "Consulta C $tag,Consulta B $tag,Consulta A $tag")
+Comprobar "Con sort no hay next_cursor" ($null -eq $r.Json.next_cursor)
+
+Write-Host "`n4. fields..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/proyectos?filter=usuario_id:eq:$usuarioId&fields=id,nombre" $null $headers
+$campos = @($r.Json.data | ForEach-Object { ($_.PSObject.Properties.Name | Sort-Object) -join "," } | Select-Object -Unique)
+Comprobar "Cada proyecto trae solo id y nombre (recibido: $($campos -join ' | '))" ($campos.Count -eq 1 -and $campos[0] -eq "id,nombre")
+$r = Invoke-Api GET "/usuarios?filter=id:eq:$usuarioId&fields=nombre" $null $headers
+Comprobar "Tambien en /usuarios" (@($r.Json.data).Count -eq 1 -and $r.Json.data[0].nombre -eq "Usuario Consultas $tag" -and -not $r.Json.data[0].id)
+
+Write-Host "`n5. Parametros invalidos..." -ForegroundColor Yellow
+foreach ($consulta in @("filter=nombre:xx:1", "filter=nombre", "sort=nombre&cursor=1", "fields=")) {
+    $r = Invoke-Api GET "/proyectos?$consulta" $null $headers
+    Comprobar "$consulta -> status 400 (recibido: $($r.Status))" ($r.Status -eq 400 -and $r.Json.error)
+}
+
+Write-Host "`n========================================" -ForegroundColor Cyan
+Write-Host "RESULTADOS:" -ForegroundColor Green
+Write-Host "========================================" -ForegroundColor Cyan
+if ($fallas -eq 0) {
+    Write-Host "Todas las verificaciones pasaron" -ForegroundColor Green
+} else {
+    Write-Host "$fallas verificaciones fallaron" -ForegroundColor Red
+}
+Write-Host "`nBENEFICIOS:" -ForegroundColor Green
+Write-Host "- El filtrado y el orden se resuelven en el servidor" -ForegroundColor White
+Write-Host "- fields reduce el tamaño de la respuesta a los campos necesarios" -ForegroundColor White
+Write-Host "========================================" -ForegroundColor Cyan
+
+if ($fallas -gt 0) { exit 1 }
@@ -0,0 +1,92 @@
+# Script de prueba para los GET condicionales (ETag / If-None-Match)
+# Verifica el 304 sin cambios y el ETag nuevo despues de una escritura
+
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host "DEMO: ETag / If-None-Match (Rendimiento)" -ForegroundColor Cyan
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host ""
+
+$baseUrl = "http://localhost:5000"
+$apiKey = "supersecreta123"
+$headers = @{"X-API-Key"=$apiKey}
+$fallas = 0
+
+# Ejecuta un request y retorna status, body y ETag sin lanzar excepción ante 304/4xx/5xx
+function Invoke-Api($Method, $Path, $Body = $null, $Headers = @{}) {
+    $params = @{ Uri = "$baseUrl$Path"; Method = $Method; Headers = $Headers; UseBasicParsing = $true }
+    if ($Body -ne $null) {
+        $params.Body = ConvertTo-Json -InputObject $Body -Depth 5
+        $params.ContentType = "application/json"
+    }
+    $etag = $null
+    try {
+        $response = Invoke-WebRequest @params -ErrorAction Stop
+        $status = [int]$response.StatusCode
+        $contenido = $response.Content
+        if ($response.Headers["ETag"]) { $etag = [string]($response.Headers["ETag"] -join "") }
+    } catch {
+        if (-not $_.Exception.Response) { throw }
+        $status = [int]$_.Exception.Response.StatusCode
+        $contenido = $_.ErrorDetails.Message
+    }
+    $json = $null
+    if ($contenido) { try { $json = $contenido | ConvertFrom-Json } catch {} }
+    return @{ Status = $status; Json = $json; ETag = $etag }
+}
+
+function Comprobar($descripcion, $condicion) {
+    if ($condicion) {
+        Write-Host "   [OK] $descripcion" -ForegroundColor Green
+    } else {
+        Write-Host "   [ERROR] $descripcion" -ForegroundColor Red
+        $script:fallas++
+    }
+}
+
+Write-Host "1. Primer GET /usuarios..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/usuarios" $null $headers
+$etag = $r.ETag
+Comprobar "Status 200 (recibido: $($r.Status))" ($r.Status -eq 200)
+Comprobar "La respuesta trae ETag: $etag" ($etag)
+
+Write-Host "`n2. GET con If-None-Match sin cambios en la coleccion..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/usuarios" $null @{"X-API-Key"=$apiKey; "If-None-Match"=$etag}
+Comprobar "Status 304 sin body (recibido: $($r.Status))" ($r.Status -eq 304)
+
+Write-Host "`n3. Escritura en la coleccion..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/usuarios" @{nombre = "Usuario Test ETag"} $headers
+Comprobar "Usuario creado: status 201 (recibido: $($r.Status))" ($r.Status -eq 201)
+$usuarioId = $r.Json.data.id
+# La invalidación de la cache L1 de los demás workers llega por pub/sub
+Start-Sleep -Seconds 1
+
+Write-Host "`n4. GET con el ETag anterior..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/usuarios" $null @{"X-API-Key"=$apiKey; "If-None-Match"=$etag}
+Comprobar "Status 200 con la coleccion actualizada (recibido: $($r.Status))" ($r.Status -eq 200 -and $r.Json.data)
+Comprobar "ETag nuevo: $($r.ETag)" ($r.ETag -and $r.ETag -ne $etag)
+$etag = $r.ETag
+$r = Invoke-Api GET "/usuarios" $null @{"X-API-Key"=$apiKey; "If-None-Match"=$etag}
+Comprobar "El ETag nuevo vuelve a dar 304 (recibido: $($r.Status))" ($r.Status -eq 304)
+
+Write-Host "`n5. GET /proyectos/<id>/tareas..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/proyectos" @{nombre = "Proyecto Test ETag"; usuario_id = $usuarioId} $headers
+$proyectoId = $r.Json.data.id
+$r = Invoke-Api GET "/proyectos/$proyectoId/tareas" $null $headers
+Comprobar "Status 200 con ETag (recibido: $($r.Status))" ($r.Status -eq 200 -and $r.ETag)
+$r = Invoke-Api GET "/proyectos/$proyectoId/tareas" $null @{"X-API-Key"=$apiKey; "If-None-Match"=$r.ETag}
+Comprobar "If-None-Match: status 304 (recibido: $($r.Status))" ($r.Status -eq 304)
+
+Write-Host "`n========================================" -ForegroundColor Cyan
+Write-Host "RESULTADOS:" -ForegroundColor Green
+Write-Host "========================================" -ForegroundColor Cyan
+if ($fallas -eq 0) {
+    Write-Host "Todas las verificaciones pasaron" -ForegroundColor Green
+} else {
+    Write-Host "$fallas verificaciones fallaron" -ForegroundColor Red
+}
+Write-Host "`nBENEFICIOS:" -ForegroundColor Green
+Write-Host "- Un cliente con la version vigente recibe 304 sin body" -ForegroundColor White
+Write-Host "- Cualquier escritura cambia el ETag de la coleccion" -ForegroundColor White
+Write-Host "========================================" -ForegroundColor Cyan
+
+if ($fallas -gt 0) { exit 1 }
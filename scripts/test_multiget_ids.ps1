@@ -0,0 +1,110 @@
+# Script de prueba para la lectura de varios registros por id (?ids=1,2,3)
+# Verifica el orden pedido, no_encontrados, denegados por Valet Key y los 400
+
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host "DEMO: Multi-get por ids" -ForegroundColor Cyan
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host ""
+
+$baseUrl = "http://localhost:5000"
+$apiKey = "supersecreta123"
+$headers = @{"X-API-Key"=$apiKey}
+$fallas = 0
+
+# Ejecuta un request y retorna status y body sin lanzar excepción ante 4xx/5xx
+function Invoke-Api($Method, $Path, $Body = $null, $Headers = @{}) {
+    $params = @{ Uri = "$baseUrl$Path"; Method = $Method; Headers = $Headers; UseBasicParsing = $true }
+    if ($Body -ne $null) {
+        $params.Body = ConvertTo-Json -InputObject $Body -Depth 5
+        $params.ContentType = "application/json"
+    }
+    try {
+        $response = Invoke-WebRequest @params -ErrorAction Stop
+        $status = [int]$response.StatusCode
+        $contenido = $response.Content
+    } catch {
+        if (-not $_.Exception.Response) { throw }
+        $status = [int]$_.Exception.Response.StatusCode
+        $contenido = $_.ErrorDetails.Message
+    }
+    $json = $null
+    if ($contenido) { try { $json = $contenido | ConvertFrom-Json } catch {} }
+    return @{ Status = $status; Json = $json }
+}
+
+function Comprobar($descripcion, $condicion) {
+    if ($condicion) {
+        Write-Host "   [OK] $descripcion" -ForegroundColor Green
+    } else {
+        Write-Host "   [ERROR] $descripcion" -ForegroundColor Red
+        $script:fallas++
+    }
+}
+
+function Ids($lista) {
+    return (@($lista | ForEach-Object { if ($_ -is [int] -or $_ -is [long]) { $_ } else { $_.id } }) -join ",")
+}
+
+Write-Host "1. Creando usuario con dos proyectos..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/usuarios" @{nombre = "Usuario Test Multi-get"} $headers
+$usuarioId = $r.Json.data.id
+$r = Invoke-Api POST "/proyectos/bulk" @(
+    @{nombre = "Proyecto Multi-get 1"; usuario_id = $usuarioId},
+    @{nombre = "Proyecto Multi-get 2"; usuario_id = $usuarioId}
+) $headers
+$proyecto1 = $r.Json.resultados[0].data.id
+$proyecto2 = $r.Json.resultados[1].data.id
+if (-not $usuarioId -or -not $proyecto1 -or -not $proyecto2) {
+    Write-Host "   [ERROR] No se pudieron crear los datos de prueba" -ForegroundColor Red
+    exit 1
+}
+Write-Host "   [OK] Usuario $usuarioId, proyectos $proyecto1 y $proyecto2" -ForegroundColor Green
+
+Write-Host "`n2. GET /proyectos?ids=..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/proyectos?ids=$proyecto1,$proyecto2,999999999" $null $headers
+Comprobar "Status 200 (recibido: $($r.Status))" ($r.Status -eq 200)
+Comprobar "data: $proyecto1,$proyecto2 (recibido: $(Ids $r.Json.data))" ((Ids $r.Json.data) -eq "$proyecto1,$proyecto2")
+Comprobar "no_encontrados: 999999999" ((Ids $r.Json.no_encontrados) -eq "999999999")
+Comprobar "denegados: vacio" (@($r.Json.denegados).Count -eq 0)
+$r = Invoke-Api GET "/proyectos?ids=$proyecto2,$proyecto1" $null $headers
+Comprobar "Respeta el orden pedido: $proyecto2,$proyecto1" ((Ids $r.Json.data) -eq "$proyecto2,$proyecto1")
+$r = Invoke-Api GET "/proyectos?ids=$proyecto1,$proyecto2&fields=id" $null $headers
+Comprobar "Con fields=id cada proyecto trae solo id" `
+    (@($r.Json.data | Where-Object { @($_.PSObject.Properties).Count -ne 1 }).Count -eq 0 -and @($r.Json.data).Count -eq 2)
+$r = Invoke-Api GET "/usuarios?ids=$usuarioId,999999999" $null $headers
+Comprobar "GET /usuarios?ids=: data $usuarioId y no_encontrados 999999999" `
+    ((Ids $r.Json.data) -eq "$usuarioId" -and (Ids $r.Json.no_encontrados) -eq "999999999")
+
+Write-Host "`n3. Valet Key restringido a proyecto_id=$proyecto1..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/valet-keys" @{
+    scopes = @("read:proyectos")
+    allowed_methods = @("GET")
+    resource_constraints = @{proyecto_id = $proyecto1}
+    expires_in_hours = 1
+} $headers
+$valetHeaders = @{"X-API-Key"=$r.Json.valet_key}
+$r = Invoke-Api GET "/proyectos?ids=$proyecto1,$proyecto2" $null $valetHeaders
+Comprobar "Status 200 (recibido: $($r.Status))" ($r.Status -eq 200)
+Comprobar "data: solo $proyecto1" ((Ids $r.Json.data) -eq "$proyecto1")
+Comprobar "denegados: $proyecto2 (sin leerse)" ((Ids $r.Json.denegados) -eq "$proyecto2" -and @($r.Json.no_encontrados).Count -eq 0)
+
+Write-Host "`n4. Parametros invalidos..." -ForegroundColor Yellow
+foreach ($consulta in @("ids=abc", "ids=", "ids=$proyecto1&sort=nombre", "ids=$proyecto1&filter=id:eq:$proyecto1")) {
+    $r = Invoke-Api GET "/proyectos?$consulta" $null $headers
+    Comprobar "$consulta -> status 400 (recibido: $($r.Status))" ($r.Status -eq 400 -and $r.Json.error)
+}
+
+Write-Host "`n========================================" -ForegroundColor Cyan
+Write-Host "RESULTADOS:" -ForegroundColor Green
+Write-Host "========================================" -ForegroundColor Cyan
+if ($fallas -eq 0) {
+    Write-Host "Todas las verificaciones pasaron" -ForegroundColor Green
+} else {
+    Write-Host "$fallas verificaciones fallaron" -ForegroundColor Red
+}
+Write-Host "`nBENEFICIOS:" -ForegroundColor Green
+Write-Host "- Varios registros en un solo request (un MGET a la cache)" -ForegroundColor White
+Write-Host "- Los ids no permitidos por el Valet Key se informan sin leerse" -ForegroundColor White
+Write-Host "========================================" -ForegroundColor Cyan
+
+if ($fallas -gt 0) { exit 1 }
@@ -112,8 +112,16 @@ $tiempoProcesamiento = Measure-Command {
         $response = Invoke-RestMethod -Uri "$baseUrl/procesar_tareas" -Method POST `
             -Headers @{"X-API-Key"=$apiKey}
         
-        $tareasProcesadas = $response.data.Count
-        Write-Host "   [OK] $tareasProcesadas tareas procesadas exitosamente" -ForegroundColor Green
+        $estado = $response.estado
+        Write-Host "   [OK] Procesamiento disparado: $($estado.pendientes) pendientes, $($estado.workers_activos) workers activos" -ForegroundColor Green
+        # Se consulta el estado sin volver a disparar el procesamiento, hasta que
+        # no queden tareas pendientes ni en vuelo en las listas de los workers
+        while ($estado.pendientes -gt 0 -or $estado.en_proceso -gt 0) {
+            Start-Sleep -Seconds 1
+            $estado = Invoke-RestMethod -Uri "$baseUrl/tareas/cola" -Method GET `
+                -Headers @{"X-API-Key"=$apiKey}
+            Write-Host "   ... $($estado.pendientes) pendientes, $($estado.en_proceso) en proceso, $($estado.procesadas) procesadas" -ForegroundColor Gray
+        }
     } catch {
         Write-Host "   [ERROR] Error al procesar tareas" -ForegroundColor Red
     }
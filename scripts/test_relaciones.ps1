@@ -0,0 +1,107 @@
+# Script de prueba para los endpoints de relaciones
+# /usuarios/<id>/proyectos y /proyectos/<id>/tareas, incluidos 404 y restricciones de Valet Key
+
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host "DEMO: Endpoints de relaciones" -ForegroundColor Cyan
+Write-Host "========================================" -ForegroundColor Cyan
+Write-Host ""
+
+$baseUrl = "http://localhost:5000"
+$apiKey = "supersecreta123"
+$headers = @{"X-API-Key"=$apiKey}
+$fallas = 0
+
+# Ejecuta un request y retorna status y body sin lanzar excepción ante 4xx/5xx
+function Invoke-Api($Method, $Path, $Body = $null, $Headers = @{}) {
+    $params = @{ Uri = "$baseUrl$Path"; Method = $Method; Headers = $Headers; UseBasicParsing = $true }
+    if ($Body -ne $null) {
+        $params.Body = ConvertTo-Json -InputObject $Body -Depth 5
+        $params.ContentType = "application/json"
+    }
+    try {
+        $response = Invoke-WebRequest @params -ErrorAction Stop
+        $status = [int]$response.StatusCode
+        $contenido = $response.Content
+    } catch {
+        if (-not $_.Exception.Response) { throw }
+        $status = [int]$_.Exception.Response.StatusCode
+        $contenido = $_.ErrorDetails.Message
+    }
+    $json = $null
+    if ($contenido) { try { $json = $contenido | ConvertFrom-Json } catch {} }
+    return @{ Status = $status; Json = $json }
+}
+
+function Comprobar($descripcion, $condicion) {
+    if ($condicion) {
+        Write-Host "   [OK] $descripcion" -ForegroundColor Green
+    } else {
+        Write-Host "   [ERROR] $descripcion" -ForegroundColor Red
+        $script:fallas++
+    }
+}
+
+Write-Host "1. Creando usuario con dos proyectos..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/usuarios" @{nombre = "Usuario Test Relaciones"} $headers
+$usuarioId = $r.Json.data.id
+$r = Invoke-Api POST "/proyectos/bulk" @(
+    @{nombre = "Proyecto Relaciones 1"; usuario_id = $usuarioId},
+    @{nombre = "Proyecto Relaciones 2"; usuario_id = $usuarioId}
+) $headers
+$proyecto1 = $r.Json.resultados[0].data.id
+$proyecto2 = $r.Json.resultados[1].data.id
+if (-not $usuarioId -or -not $proyecto1 -or -not $proyecto2) {
+    Write-Host "   [ERROR] No se pudieron crear los datos de prueba" -ForegroundColor Red
+    exit 1
+}
+Write-Host "   [OK] Usuario $usuarioId, proyectos $proyecto1 y $proyecto2" -ForegroundColor Green
+
+Write-Host "`n2. GET /usuarios/$usuarioId/proyectos..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/usuarios/$usuarioId/proyectos" $null $headers
+$ids = @($r.Json.data | ForEach-Object { $_.id })
+Comprobar "Status 200 (recibido: $($r.Status))" ($r.Status -eq 200)
+Comprobar "Incluye los proyectos $proyecto1 y $proyecto2" (($ids -contains $proyecto1) -and ($ids -contains $proyecto2))
+Comprobar "Todos pertenecen al usuario $usuarioId" (@($r.Json.data | Where-Object { $_.usuario_id -ne $usuarioId }).Count -eq 0)
+$r = Invoke-Api GET "/usuarios/$usuarioId/proyectos?limit=1" $null $headers
+Comprobar "Con limit=1: un proyecto y next_cursor" (@($r.Json.data).Count -eq 1 -and $r.Json.next_cursor)
+$r = Invoke-Api GET "/usuarios/999999999/proyectos" $null $headers
+Comprobar "Usuario inexistente: status 404 (recibido: $($r.Status))" ($r.Status -eq 404 -and $r.Json.error)
+
+Write-Host "`n3. GET /proyectos/$proyecto1/tareas..." -ForegroundColor Yellow
+$r = Invoke-Api GET "/proyectos/$proyecto1/tareas" $null $headers
+Comprobar "Status 200 con lista en 'data' (recibido: $($r.Status))" ($r.Status -eq 200 -and $r.Json.PSObject.Properties.Name -contains "data")
+Comprobar "Todas las tareas son del proyecto $proyecto1" (@($r.Json.data | Where-Object { $_.proyecto_id -ne $proyecto1 }).Count -eq 0)
+$r = Invoke-Api GET "/proyectos/999999999/tareas" $null $headers
+Comprobar "Proyecto inexistente: status 404 (recibido: $($r.Status))" ($r.Status -eq 404 -and $r.Json.error)
+
+Write-Host "`n4. Valet Key restringido a proyecto_id=$proyecto1..." -ForegroundColor Yellow
+$r = Invoke-Api POST "/valet-keys" @{
+    scopes = @("read:proyectos", "read:tareas")
+    allowed_methods = @("GET")
+    resource_constraints = @{proyecto_id = $proyecto1}
+    expires_in_hours = 1
+} $headers
+$valetHeaders = @{"X-API-Key"=$r.Json.valet_key}
+Comprobar "Valet Key generado (status: $($r.Status))" ($r.Status -eq 201 -and $r.Json.valet_key)
+$r = Invoke-Api GET "/proyectos/$proyecto1/tareas" $null $valetHeaders
+Comprobar "Tareas del proyecto permitido: status 200 (recibido: $($r.Status))" ($r.Status -eq 200)
+$r = Invoke-Api GET "/proyectos/$proyecto2/tareas" $null $valetHeaders
+Comprobar "Tareas de otro proyecto: status 403 (recibido: $($r.Status))" ($r.Status -eq 403)
+$r = Invoke-Api GET "/usuarios/$usuarioId/proyectos" $null $valetHeaders
+$ids = @($r.Json.data | ForEach-Object { $_.id })
+Comprobar "Proyectos del usuario: solo ve el proyecto $proyecto1" ($r.Status -eq 200 -and $ids.Count -eq 1 -and $ids[0] -eq $proyecto1)
+
+Write-Host "`n========================================" -ForegroundColor Cyan
+Write-Host "RESULTADOS:" -ForegroundColor Green
+Write-Host "========================================" -ForegroundColor Cyan
+if ($fallas -eq 0) {
+    Write-Host "Todas las verificaciones pasaron" -ForegroundColor Green
+} else {
+    Write-Host "$fallas verificaciones fallaron" -ForegroundColor Red
+}
+Write-Host "`nBENEFICIOS:" -ForegroundColor Green
+Write-Host "- Las relaciones se resuelven con indices secundarios, sin recorrer la coleccion" -ForegroundColor White
+Write-Host "- Un Valet Key restringido solo ve los proyectos que tiene permitidos" -ForegroundColor White
+Write-Host "========================================" -ForegroundColor Cyan
+
+if ($fallas -gt 0) { exit 1 }